@@ -0,0 +1,78 @@
+import asyncio
+import queue
+import threading
+from typing import Callable
+
+
+class RoomActor:
+    """Exécute les commandes d'une room une par une, dans un thread dédié.
+
+    Toutes les modifications de l'état d'une GameRoom passent par submit(),
+    ce qui garantit qu'elles sont appliquées dans l'ordre d'arrivée sans verrou.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.commands: queue.Queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, func: Callable, *args) -> None:
+        """Ajoute une commande à la file de la room"""
+        self.commands.put((func, args))
+
+    def is_idle(self) -> bool:
+        """Vrai s'il ne reste aucune commande en attente"""
+        return self.commands.empty()
+
+    def stop(self) -> None:
+        """Arrête le worker une fois les commandes en attente traitées"""
+        self.commands.put(None)
+
+    def run(self) -> None:
+        while True:
+            command = self.commands.get()
+            if command is None:
+                return
+            func, args = command
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Erreur dans {self.name}: {str(e)}")
+
+
+class AsyncRoomActor:
+    """Équivalent de RoomActor pour le moteur asyncio : une tâche par room"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.loop = asyncio.get_running_loop()
+        self.commands: asyncio.Queue = asyncio.Queue()
+        self.task = self.loop.create_task(self.run(), name=name)
+
+    def submit(self, func: Callable, *args) -> None:
+        """Ajoute une commande à la file de la room (appelable depuis un autre thread)"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.commands.put_nowait((func, args))
+        else:
+            self.loop.call_soon_threadsafe(self.commands.put_nowait, (func, args))
+
+    def is_idle(self) -> bool:
+        return self.commands.empty()
+
+    def stop(self) -> None:
+        self.submit(None)
+
+    async def run(self) -> None:
+        while True:
+            func, args = await self.commands.get()
+            if func is None:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Erreur dans {self.name}: {str(e)}")
@@ -0,0 +1 @@
+"""Micro-benchmarks des chemins critiques du moteur de jeu"""
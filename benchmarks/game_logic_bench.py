@@ -0,0 +1,202 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+from game_logic import GameLogic
+from server import GameRoom
+
+DEFAULT_SIZES = [7, 25, 100]
+DEFAULT_PLAYERS = [4, 32, 256]
+DEFAULT_THRESHOLD = 0.25  # Régression signalée au-delà de +25 %
+SPECTATORS = 200  # Spectateurs ajoutés pour broadcast_game_state_spectators
+
+
+class FakeSocket:
+    """Socket factice : compte les octets au lieu de les envoyer"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def sendall(self, data: bytes) -> None:
+        self.bytes_sent += len(data)
+
+    def send_frame(self, data: bytes, kind: str = None) -> None:
+        self.bytes_sent += len(data)
+
+    def close(self) -> None:
+        pass
+
+
+def measure(func: Callable[[], None], min_time: float, repeat: int = 3) -> float:
+    """Meilleur temps par appel (en secondes).
+
+    Le nombre d'appels par série est calibré pour durer environ min_time,
+    comme timeit.autorange, afin que les cas lents ne dominent pas la durée totale.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def populated_logic(size: int, nb_players: int, seed: int = 0) -> GameLogic:
+    logic = GameLogic(size, random.Random(seed))
+    for i in range(nb_players):
+        logic.add_player(f"p{i}", 'loup' if i < max(1, nb_players // 4) else 'villageois')
+    return logic
+
+
+def started_room(size: int, nb_players: int, seed: int = 0) -> GameRoom:
+    room = GameRoom("bench", actor_factory=lambda name: None, size=size)
+    room.rng.seed(seed)  # Partagé avec room.game_logic : rôles et placements reproductibles
+    for i in range(nb_players):
+        room.add_player(FakeSocket(), f"p{i}")
+    room.start_game(next(iter(room.players)))
+    return room
+
+
+def bench_case(size: int, nb_players: int, min_time: float) -> Dict[str, float]:
+    """Mesure chaque chemin critique pour une taille de carte et un nombre de joueurs"""
+    results = {}
+    names = [f"p{i}" for i in range(nb_players)]
+
+    def add_all_players():
+        logic = GameLogic(size)
+        for name in names:
+            logic.add_player(name, 'villageois')
+
+    # add_player : coût par joueur, grille neuve à chaque série
+    results["add_player"] = measure(add_all_players, min_time) / nb_players
+    # Grille d'une nouvelle partie : GameLogic neuf ou remis à zéro (room reprise du pool)
+    game_rng = random.Random(0)
+    results["new_game_logic"] = measure(lambda: GameLogic(size, game_rng), min_time)
+    pooled_logic = populated_logic(size, nb_players)
+    results["reset_game_logic"] = measure(lambda: pooled_logic.reset(game_rng), min_time)
+
+    logic = populated_logic(size, nb_players)
+    results["get_random_empty_position"] = measure(logic.get_random_empty_position, min_time)
+
+    rng = random.Random(1)
+    results["move_player"] = measure(
+        lambda: logic.move_player(names[rng.randrange(nb_players)], rng.randint(1, 8)), min_time
+    )
+    # resolve_tick : un coup par joueur vivant, résolus ensemble (mode temps réel)
+    tick_logic = populated_logic(size, nb_players)
+    results["resolve_tick"] = measure(
+        lambda: tick_logic.resolve_tick({name: rng.randint(1, 8) for name in names}), min_time
+    )
+    results["is_valid_move"] = measure(
+        lambda: logic.is_valid_move(rng.randrange(size), rng.randrange(size), names[rng.randrange(nb_players)]),
+        min_time
+    )
+    results["get_environment"] = measure(
+        lambda: logic.get_environment(names[rng.randrange(nb_players)]), min_time
+    )
+
+    room = started_room(size, nb_players)
+
+    def snapshot_broadcast():
+        room.sync_state.clear()  # Force l'envoi d'instantanés complets
+        room.broadcast_game_state()
+
+    results["broadcast_game_state_snapshot"] = measure(snapshot_broadcast, min_time)
+
+    def move_and_broadcast():
+        room.game_logic.move_player(names[rng.randrange(nb_players)], rng.randint(1, 8))
+        room.broadcast_game_state()
+
+    results["broadcast_game_state_delta"] = measure(move_and_broadcast, min_time)
+
+    # Même coup avec des spectateurs : le flux complet est encodé une fois pour tous
+    for _ in range(SPECTATORS):
+        room.add_spectator(FakeSocket())
+    results["broadcast_game_state_spectators"] = measure(move_and_broadcast, min_time)
+    return results
+
+
+def run(sizes: List[int], players: List[int], min_time: float) -> dict:
+    results = {}
+    for size in sizes:
+        free_cells = (size - 2) ** 2
+        for nb_players in players:
+            if nb_players > free_cells // 2:
+                continue  # Carte trop petite pour ce nombre de joueurs
+            for name, seconds in bench_case(size, nb_players, min_time).items():
+                results[f"{name}[size={size},players={nb_players}]"] = seconds * 1e6
+    return {
+        "unit": "us_per_call",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[Tuple[str, float, float, float]]:
+    """Renvoie les cas plus lents que la référence au-delà du seuil"""
+    regressions = []
+    for key, value in current["results"].items():
+        reference = baseline.get("results", {}).get(key)
+        if reference:
+            ratio = value / reference
+            if ratio > 1 + threshold:
+                regressions.append((key, reference, value, ratio))
+    return regressions
+
+
+def missing_references(current: dict, baseline: dict) -> List[str]:
+    """Cas mesurés qui n'ont pas de valeur dans la référence (référence à régénérer)"""
+    reference = baseline.get("results", {})
+    return sorted(key for key in current["results"] if key not in reference)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de GameLogic et GameRoom")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--players", type=int, nargs="+", default=DEFAULT_PLAYERS)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Durée minimale d'une série (s)")
+    parser.add_argument("--output", help="Écrit les résultats JSON dans ce fichier")
+    parser.add_argument("--compare", help="Fichier JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.players, args.min_time)
+    for key, value in sorted(report["results"].items()):
+        print(f"{key:<60} {value:12.2f} us")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for key, reference, value, ratio in regressions:
+            print(f"RÉGRESSION {key}: {reference:.2f} -> {value:.2f} us (x{ratio:.2f})")
+        missing = missing_references(report, baseline)
+        for key in missing:
+            print(f"SANS RÉFÉRENCE {key}")
+        if regressions or missing:
+            return 1
+        print("Aucune régression par rapport à la référence")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
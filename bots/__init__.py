@@ -0,0 +1,4 @@
+"""Bots sans interface et générateur de charge pour le serveur Loup-Garou"""
+from bots.client import BotClient, BotStats, ScriptedStrategy, random_strategy
+
+__all__ = ["BotClient", "BotStats", "ScriptedStrategy", "random_strategy"]
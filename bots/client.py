@@ -0,0 +1,222 @@
+import asyncio
+import itertools
+import random
+import time
+from typing import Callable, Iterable, List, Optional
+from codec import CODECS, JSON_CODEC, supported_codecs
+from protocol import RECV_SIZE, RESYNC_RETRY, FrameDecoder, apply_changes, encode_message
+
+# Même correspondance que GameLogic.get_new_position
+DIRECTIONS = {
+    1: (0, -1), 2: (0, 1), 3: (-1, 0), 4: (1, 0),
+    5: (-1, -1), 6: (1, -1), 7: (1, 1), 8: (-1, 1)
+}
+
+
+def random_strategy(bot: "BotClient") -> int:
+    """Stratégie par défaut : une direction au hasard parmi celles qui semblent jouables"""
+    if 'P' not in bot.board or not bot.grid_size:
+        return random.choice(list(DIRECTIONS))
+    y, x = divmod(bot.board.index('P'), bot.grid_size)
+    playable = []
+    for direction, (dx, dy) in DIRECTIONS.items():
+        cell = bot.board[(y + dy) * bot.grid_size + x + dx]
+        if cell == ' ' or (cell == 'V' and bot.role == 'loup'):
+            playable.append(direction)
+    return random.choice(playable or list(DIRECTIONS))
+
+
+class ScriptedStrategy:
+    """Rejoue une suite de directions en boucle"""
+
+    def __init__(self, directions: Iterable[int]):
+        self.directions = itertools.cycle(list(directions))
+
+    def __call__(self, bot: "BotClient") -> int:
+        return next(self.directions)
+
+
+class BotStats:
+    """Mesures collectées par un ensemble de bots"""
+
+    def __init__(self):
+        self.connect_latencies: List[float] = []
+        self.move_latencies: List[float] = []
+        self.messages_received = 0
+        self.messages_sent = 0
+        self.bytes_received = 0
+        self.errors = 0
+
+
+class BotClient:
+    """Client sans interface basé sur asyncio, qui suit l'état du jeu comme client.py.
+
+    Le bot joue quand c'est son tour selon sa stratégie et peut envoyer des
+    messages de chat à intervalle régulier.
+    """
+
+    def __init__(self, name: str, game_id: str, strategy: Callable = random_strategy,
+                 stats: BotStats = None, size: int = None, codecs: List[str] = None, mode: str = None):
+        self.name = name
+        self.game_id = game_id
+        self.strategy = strategy
+        self.stats = stats or BotStats()
+        self.size = size
+        self.mode = mode
+        self.codecs = codecs if codecs is not None else supported_codecs()
+        self.codec = JSON_CODEC
+        self.token = None  # Jeton de session : une nouvelle connexion reprend la même place
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.reader_task: Optional[asyncio.Task] = None
+
+        # État du jeu
+        self.role = None
+        self.board: List[str] = []
+        self.board_seq = None
+        self.resync_requested_at = None  # Resync demandé et pas encore reçu
+        self.grid_size = None
+        self.is_your_turn = False
+        self.player_status = "alive"
+        self.players: List[str] = []
+        self.turn_event = asyncio.Event()
+        self.move_sent_at = None
+
+    async def connect(self, host: str, port: int) -> None:
+        """Se connecte et rejoint la partie"""
+        started = time.perf_counter()
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.stats.connect_latencies.append(time.perf_counter() - started)
+
+        message = {"type": "connection", "name": self.name, "game_id": self.game_id, "codecs": self.codecs}
+        if self.size:
+            message["size"] = self.size
+        if self.mode:
+            message["mode"] = self.mode
+        if self.token:
+            message["token"] = self.token
+        self.send(message)
+        self.reader_task = asyncio.get_running_loop().create_task(self.receive_messages())
+
+    def send(self, message: dict) -> None:
+        if self.writer is None or self.writer.is_closing():
+            return
+        self.writer.write(encode_message(message, self.codec))
+        self.stats.messages_sent += 1
+
+    async def receive_messages(self) -> None:
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = await self.reader.read(RECV_SIZE)
+                if not data:
+                    break
+                self.stats.bytes_received += len(data)
+                for message in decoder.feed_messages(data):
+                    self.stats.messages_received += 1
+                    self.handle_message(message)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            self.stats.errors += 1
+            print(f"Erreur du bot {self.name}: {str(e)}")
+        finally:
+            self.turn_event.set()  # Débloque play()
+
+    def handle_message(self, message: dict) -> None:
+        msg_type = message.get("type")
+
+        if msg_type == "codec":
+            self.codec = CODECS.get(message.get("codec"), JSON_CODEC)
+        elif msg_type == "session":
+            self.token = message.get("token")
+        elif msg_type == "matched":
+            self.game_id = message.get("game_id")  # Partie attribuée par le matchmaking
+        elif msg_type == "ping":
+            self.send({"type": "pong", "id": message.get("id")})
+        elif msg_type == "player_list":
+            self.players = message.get("players", [])
+        elif msg_type == "role_assignment":
+            self.role = message.get("role")
+        elif msg_type == "game_state":
+            self.board = list(message.get("environment", []))
+            self.board_seq = message.get("seq")
+            self.resync_requested_at = None
+            self.grid_size = message.get("size")
+            self.update_state(message)
+        elif msg_type == "game_state_delta":
+            seq = message.get("seq")
+            if self.board_seq is None or seq != self.board_seq + 1:
+                self.board_seq = None
+                self.request_resync()
+                return
+            self.board_seq = seq
+            apply_changes(self.board, message.get("changes", []))
+            self.update_state(message)
+        elif msg_type == "error":
+            self.stats.errors += 1
+
+    def request_resync(self) -> None:
+        """Demande un état complet, une seule fois tant qu'il n'est pas arrivé"""
+        now = time.monotonic()
+        if self.resync_requested_at is None or now - self.resync_requested_at >= RESYNC_RETRY:
+            self.resync_requested_at = now
+            self.send({"type": "resync", "game_id": self.game_id})
+
+    def update_state(self, message: dict) -> None:
+        # Première mise à jour reçue après un déplacement : aller-retour mesuré
+        if self.move_sent_at is not None:
+            self.stats.move_latencies.append(time.perf_counter() - self.move_sent_at)
+            self.move_sent_at = None
+        self.is_your_turn = message.get("is_your_turn", self.is_your_turn)
+        self.player_status = message.get("player_status", self.player_status)
+        if self.is_your_turn and self.player_status == "alive":
+            self.turn_event.set()
+
+    def start_game(self) -> None:
+        self.send({"type": "start_game", "game_id": self.game_id})
+
+    def chat(self, content: str) -> None:
+        self.send({"type": "message", "content": content, "game_id": self.game_id, "player": self.name})
+
+    async def play(self, stop: asyncio.Event, move_delay: float = 0.0, move_timeout: float = 1.0) -> None:
+        """Joue un coup à chaque fois que c'est au tour du bot, jusqu'à stop"""
+        while not stop.is_set() and self.connected:
+            try:
+                await asyncio.wait_for(self.turn_event.wait(), move_timeout)
+            except asyncio.TimeoutError:
+                # Coup refusé (mur...) : aucune réponse, on retente si c'est toujours notre tour
+                if not (self.is_your_turn and self.player_status == "alive"):
+                    continue
+            self.turn_event.clear()
+            if stop.is_set() or self.player_status != "alive" or not self.is_your_turn:
+                continue
+            if move_delay:
+                await asyncio.sleep(move_delay)
+            self.move_sent_at = time.perf_counter()
+            self.send({"type": "move", "direction": self.strategy(self), "game_id": self.game_id})
+
+    async def chat_loop(self, stop: asyncio.Event, interval: float) -> None:
+        """Envoie un message de chat toutes les interval secondes"""
+        count = 0
+        while not stop.is_set() and self.connected:
+            await asyncio.sleep(interval)
+            count += 1
+            self.chat(f"message {count} de {self.name}")
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing() and \
+            self.reader_task is not None and not self.reader_task.done()
+
+    async def close(self) -> None:
+        if self.writer is None:
+            return
+        self.send({"type": "disconnect", "game_id": self.game_id, "name": self.name})
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        if self.reader_task:
+            self.reader_task.cancel()
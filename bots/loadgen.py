@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+from bots.client import BotClient, BotStats, ScriptedStrategy, random_strategy
+from lobby import ANY_GAME
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentile par la méthode du rang le plus proche"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> dict:
+    """Résumé d'une série de latences, en millisecondes"""
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p90_ms": percentile(values, 0.90) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": max(values) * 1000 if values else 0.0
+    }
+
+
+async def connect_bot(bot: BotClient, host: str, port: int, semaphore: asyncio.Semaphore) -> None:
+    async with semaphore:
+        try:
+            await bot.connect(host, port)
+        except OSError as e:
+            bot.stats.errors += 1
+            print(f"Connexion impossible pour {bot.name}: {str(e)}")
+
+
+async def run_load(args) -> dict:
+    """Lance les bots, les fait jouer pendant args.duration secondes et renvoie le rapport"""
+    stats = BotStats()
+    strategy = ScriptedStrategy(args.script) if args.script else random_strategy
+    codecs = [args.codec] if args.codec else None
+    bots = [
+        BotClient(f"bot{i}", ANY_GAME if args.matchmaking else f"{args.game_prefix}{i // args.per_game}",
+                  strategy, stats, size=args.size, codecs=codecs, mode=args.mode)
+        for i in range(args.players)
+    ]
+
+    # Connexions (concurrence limitée pour ne pas saturer le backlog du serveur)
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(connect_bot(bot, args.host, args.port, semaphore) for bot in bots))
+    connect_duration = time.perf_counter() - started
+
+    # Laisse aux rooms le temps de traiter les connexions, puis un bot par partie démarre
+    # (les rooms du matchmaking démarrent d'elles-mêmes)
+    await asyncio.sleep(args.join_wait)
+    if not args.matchmaking:
+        for bot in bots[::args.per_game]:
+            bot.start_game()
+
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(bot.play(stop, args.move_delay)) for bot in bots if bot.connected]
+    if args.chat_rate > 0:
+        tasks += [asyncio.create_task(bot.chat_loop(stop, 1.0 / args.chat_rate)) for bot in bots if bot.connected]
+
+    received_before = stats.messages_received
+    play_started = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    play_duration = time.perf_counter() - play_started
+    received = stats.messages_received - received_before
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.gather(*(bot.close() for bot in bots), return_exceptions=True)
+
+    return {
+        "players": args.players,
+        "games": len({bot.game_id for bot in bots}),
+        "connected": len(stats.connect_latencies),
+        "connect_duration_s": connect_duration,
+        "connect_latency": summarize(stats.connect_latencies),
+        "move_round_trip": summarize(stats.move_latencies),
+        "messages_per_second": received / play_duration if play_duration else 0.0,
+        "bytes_per_second": stats.bytes_received / (time.perf_counter() - started),
+        "messages_sent": stats.messages_sent,
+        "errors": stats.errors
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"Joueurs connectés : {report['connected']}/{report['players']} ({report['games']} parties)")
+    for label, key in (("Connexion", "connect_latency"), ("Coup -> game_state", "move_round_trip")):
+        summary = report[key]
+        print(f"{label:<20} n={summary['count']:<7} p50={summary['p50_ms']:.2f}ms "
+              f"p90={summary['p90_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms max={summary['max_ms']:.2f}ms")
+    print(f"Messages reçus/s    : {report['messages_per_second']:.0f}")
+    print(f"Octets reçus/s      : {report['bytes_per_second']:.0f}")
+    print(f"Erreurs             : {report['errors']}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Générateur de charge Loup-Garou (bots sans interface)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--players", type=int, default=100, help="Nombre total de bots")
+    parser.add_argument("--per-game", type=int, default=4, help="Bots par partie")
+    parser.add_argument("--game-prefix", default="load-")
+    parser.add_argument("--matchmaking", action="store_true",
+                        help="Les bots demandent n'importe quelle partie au lieu d'une partie par --per-game bots")
+    parser.add_argument("--size", type=int, default=None, help="Taille de carte des parties créées")
+    parser.add_argument("--mode", choices=("turns", "tick"), default=None, help="Mode des parties créées")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée de jeu en secondes")
+    parser.add_argument("--move-delay", type=float, default=0.0, help="Temps de réflexion avant chaque coup")
+    parser.add_argument("--chat-rate", type=float, default=0.0, help="Messages de chat par seconde et par bot")
+    parser.add_argument("--script", type=int, nargs="*", help="Directions jouées en boucle au lieu du hasard")
+    parser.add_argument("--codec", default=None, help="Force un codec (json, compact...)")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--join-wait", type=float, default=1.0)
+    parser.add_argument("--json", action="store_true", help="Affiche le rapport en JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
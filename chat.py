@@ -0,0 +1,42 @@
+import time
+from typing import List
+
+CHAT_RATE = 2.0           # Messages par seconde autorisés en régime établi, par joueur
+CHAT_BURST = 5            # Messages pouvant être envoyés d'affilée
+CHAT_HISTORY_SIZE = 50    # Derniers messages gardés par room et envoyés à l'arrivée
+CHAT_BATCH_WINDOW = 0.1   # Délai de regroupement des messages avant diffusion (s)
+MAX_CHAT_LENGTH = 500
+
+
+class TokenBucket:
+    """Limiteur de débit : rate jetons par seconde, au plus capacity en réserve"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "limited")
+
+    def __init__(self, rate: float = CHAT_RATE, capacity: float = CHAT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.limited = False  # Vrai depuis le premier refus, jusqu'au prochain message accepté
+
+    def consume(self, now: float = None) -> bool:
+        """Prend un jeton s'il y en a un ; renvoie False si le débit est dépassé"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def chat_message(entries: List[dict]) -> dict:
+    """Message à diffuser pour une liste d'entrées {player, content}.
+
+    Une entrée seule reste un message "chat" classique ; plusieurs entrées
+    sont regroupées dans un seul message "chat_batch".
+    """
+    if len(entries) == 1:
+        return dict(entries[0], type="chat")
+    return {"type": "chat_batch", "messages": entries}
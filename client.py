@@ -2,8 +2,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import socket
 import threading
-import json
+import time
 from typing import List
+from codec import CODECS, JSON_CODEC, supported_codecs
+from protocol import RESYNC_RETRY, apply_changes, iter_messages, send_message
+
+# Pings manqués avant de considérer le serveur injoignable (connexion à moitié ouverte)
+MISSED_PINGS = 3
 
 class Connexion:
     def __init__(self, message_callback):
@@ -12,8 +17,11 @@ class Connexion:
         self.message_callback = message_callback
         self.player_name = None
         self.game_id = None
+        self.codec = JSON_CODEC  # Remplacé si le serveur accepte un codec binaire
+        # Jetons de session par partie : permettent de retrouver sa place après une coupure
+        self.session_tokens = {}
         
-    def connect(self, host, port, player_name, game_id):
+    def connect(self, host, port, player_name, game_id, size=None, mode=None, spectate=False):
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((host, port))
@@ -21,12 +29,22 @@ class Connexion:
             self.player_name = player_name
             self.game_id = game_id
             
+            self.codec = JSON_CODEC
             player_info = {
                 "type": "connection",
                 "name": player_name,
-                "game_id": game_id
+                "game_id": game_id,
+                "codecs": supported_codecs()
             }
-            self.socket.send(json.dumps(player_info).encode())
+            if size:
+                player_info["size"] = size  # Taille de carte si la partie est créée
+            if mode:
+                player_info["mode"] = mode  # "tick" pour une partie en temps réel
+            if spectate:
+                player_info["spectate"] = True  # Suit la partie sans y jouer
+            elif game_id in self.session_tokens:
+                player_info["token"] = self.session_tokens[game_id]
+            send_message(self.socket, player_info)
             
             self.connected = True
             threading.Thread(target=self.receive_messages, daemon=True).start()
@@ -38,13 +56,15 @@ class Connexion:
     def send_disconnect_message(self):
         """Envoie un message de déconnexion au serveur"""
         if self.connected and self.socket:
+            # Départ volontaire : le serveur libère la place, le jeton ne sert plus
+            self.session_tokens.pop(self.game_id, None)
             try:
                 disconnect_msg = {
                     "type": "disconnect",
                     "game_id": self.game_id,
                     "name": self.player_name
                 }
-                self.socket.send(json.dumps(disconnect_msg).encode())
+                self.send(disconnect_msg)
             except:
                 pass
             
@@ -59,48 +79,45 @@ class Connexion:
                 "game_id": game_id,
                 "player": player_name
             }
-            self.socket.send(json.dumps(message).encode())
+            self.send(message)
             return True, None
         except Exception as e:
             return False, str(e)
             
     def receive_messages(self):
         """Reçoit et traite les messages du serveur"""
-        buffer = ""
-        while self.connected:
-            try:
-                data = self.socket.recv(1024).decode()
-                if not data:
+        try:
+            for message in iter_messages(self.socket):
+                if not self.connected:
                     break
-                    
-                buffer += data
-                
-                # Traite tous les messages complets dans le buffer
-                while True:
-                    try:
-                        # Trouve la première occurrence d'un message JSON complet
-                        json_end = buffer.find('}') + 1
-                        if json_end <= 0:
-                            break
-                            
-                        message = json.loads(buffer[:json_end])
-                        self.message_callback(message)
-                        
-                        # Retire le message traité du buffer
-                        buffer = buffer[json_end:].strip()
-                        
-                    except json.JSONDecodeError:
-                        # Si le message n'est pas un JSON complet, on attend plus de données
-                        break
-                    except Exception as e:
-                        print(f"Erreur de traitement du message: {str(e)}")
-                        break
-                        
-            except Exception as e:
-                print(f"Erreur de réception: {str(e)}")
-                self.connected = False
-                break
-                
+                if message.get("type") == "codec":
+                    # Le serveur a choisi un des codecs proposés
+                    self.codec = CODECS.get(message.get("codec"), JSON_CODEC)
+                    continue
+                if message.get("type") == "session":
+                    self.session_tokens[self.game_id] = message.get("token")
+                    continue
+                if message.get("type") == "ping":
+                    self.send({"type": "pong", "id": message.get("id")})
+                    if message.get("interval"):
+                        # Le serveur pingue régulièrement : son silence prolongé signale une coupure
+                        self.socket.settimeout(message["interval"] * MISSED_PINGS)
+                    continue
+                if message.get("type") == "matched":
+                    # Partie choisie par le matchmaking (game_id "*")
+                    self.game_id = message.get("game_id")
+                try:
+                    self.message_callback(message)
+                except Exception as e:
+                    print(f"Erreur de traitement du message: {str(e)}")
+        except Exception as e:
+            print(f"Erreur de réception: {str(e)}")
+        self.connected = False
+
+    def send(self, message):
+        """Envoie un message avec le codec négocié"""
+        send_message(self.socket, message, self.codec)
+
     def cleanup(self):
         if self.connected:
             self.send_disconnect_message()
@@ -118,10 +135,18 @@ class ClientApp:
         # Variables
         self.player_name = tk.StringVar()
         self.game_id = tk.StringVar()
+        self.map_size = tk.IntVar(value=7)
+        self.realtime = tk.BooleanVar(value=False)
+        self.spectate = tk.BooleanVar(value=False)
         self.message_var = tk.StringVar()
         self.is_connected = False
         self.game_started = False
         self.game_ui = None
+        # Dernier état complet connu, mis à jour par les deltas du serveur
+        self.board = []
+        self.board_seq = None
+        self.resync_requested_at = None  # Resync demandé et pas encore reçu
+        self.game_state = {}
         
         # Initialisation du gestionnaire réseau
         self.network = Connexion(self.handle_message)
@@ -149,9 +174,17 @@ class ClientApp:
         
         ttk.Label(connection_frame, text="ID Partie:").grid(row=0, column=2, padx=5, pady=5)
         ttk.Entry(connection_frame, textvariable=self.game_id).grid(row=0, column=3, padx=5, pady=5)
+
+        ttk.Label(connection_frame, text="Taille carte:").grid(row=0, column=4, padx=5, pady=5)
+        ttk.Spinbox(connection_frame, from_=5, to=256, width=5,
+                    textvariable=self.map_size).grid(row=0, column=5, padx=5, pady=5)
+        ttk.Checkbutton(connection_frame, text="Temps réel",
+                        variable=self.realtime).grid(row=0, column=6, padx=5, pady=5)
+        ttk.Checkbutton(connection_frame, text="Spectateur",
+                        variable=self.spectate).grid(row=0, column=7, padx=5, pady=5)
         
         button_frame = ttk.Frame(connection_frame)
-        button_frame.grid(row=0, column=4, padx=5, pady=5)
+        button_frame.grid(row=0, column=8, padx=5, pady=5)
         
         self.connect_button = ttk.Button(button_frame, text="Connexion", command=self.connect_to_server)
         self.connect_button.pack(side='left', padx=2)
@@ -232,7 +265,7 @@ class ClientApp:
                 "type": "start_game",
                 "game_id": self.game_id.get()
             }
-            self.network.socket.send(json.dumps(message).encode())
+            self.network.send(message)
 
     def connect_to_server(self):
         if not self.player_name.get() or not self.game_id.get():
@@ -243,7 +276,10 @@ class ClientApp:
             'localhost', 
             12345, 
             self.player_name.get(), 
-            self.game_id.get()
+            self.game_id.get(),
+            self.map_size.get(),
+            "tick" if self.realtime.get() else None,
+            self.spectate.get()
         )
         
         if success:
@@ -307,33 +343,87 @@ class ClientApp:
             
         elif msg_type == "chat":
             self.add_message(f"{message.get('player')}: {message.get('content')}")
+
+        elif msg_type == "matched":
+            self.game_id.set(message.get("game_id"))
+            self.add_message(f"Partie trouvée : {message.get('game_id')}")
+
+        elif msg_type == "chat_batch":
+            # Plusieurs messages regroupés par le serveur (ou historique à l'arrivée)
+            for entry in message.get("messages", []):
+                self.add_message(f"{entry.get('player')}: {entry.get('content')}")
             
         elif msg_type == "role_assignment":
             self.handle_role_assignment(message)
             
         elif msg_type == "game_state":
             self.handle_game_state(message)
+
+        elif msg_type == "game_state_delta":
+            self.handle_game_state_delta(message)
             
         elif msg_type == "error":
             messagebox.showerror("Erreur", message.get("content"))
             
 
     def handle_game_state(self, message):
-        """Gère les mises à jour d'état du jeu"""
+        """Gère les mises à jour d'état du jeu (instantané complet)"""
         if not self.game_started:
             self.start_game_ui()
             
-        environment = message.get("environment", [])
-        is_your_turn = message.get("is_your_turn", False)
-        player_status = message.get("player_status", "alive")
-        current_player = message.get("current_player", "En attente...")
+        size = message.get("size", 7)
+        self.board = list(message.get("environment", []))
+        self.board_seq = message.get("seq")
+        self.resync_requested_at = None
+        self.game_state = {
+            "is_your_turn": message.get("is_your_turn", False),
+            "player_status": message.get("player_status", "alive"),
+            "current_player": message.get("current_player", "En attente...")
+        }
         
-        # Mise à jour du status et du tour
         if self.game_ui:
-            self.game_ui.set_status(player_status)
-            self.game_ui.set_turn(current_player)
-            self.game_ui.update_grid(environment)
-            self.game_ui.set_move_enabled(is_your_turn and player_status == 'alive')
+            self.game_ui.resize(size)  # La taille de la grille vient du serveur
+            self.refresh_game_ui()
+            self.game_ui.update_grid(self.board)
+
+    def handle_game_state_delta(self, message):
+        """Applique un delta sur la grille en cache, ou demande un état complet en cas de trou"""
+        seq = message.get("seq")
+        if self.board_seq is None or seq != self.board_seq + 1:
+            self.board_seq = None  # On ignore les deltas jusqu'au prochain instantané
+            self.request_resync()
+            return
+
+        self.board_seq = seq
+        changes = message.get("changes", [])
+        apply_changes(self.board, changes)
+        for key in self.game_state:
+            if key in message:
+                self.game_state[key] = message[key]
+
+        if self.game_ui:
+            self.refresh_game_ui()
+            self.game_ui.update_cells(self.board, [index for index, _ in changes])
+
+    def refresh_game_ui(self):
+        """Met à jour le status, le tour et les contrôles"""
+        player_status = self.game_state["player_status"]
+        self.game_ui.set_status(player_status)
+        self.game_ui.set_turn(self.game_state["current_player"])
+        self.game_ui.set_move_enabled(self.game_state["is_your_turn"] and player_status == 'alive')
+
+    def request_resync(self):
+        """Demande au serveur un état complet (une seule fois tant qu'il n'est pas arrivé)"""
+        now = time.monotonic()
+        if self.resync_requested_at is not None and now - self.resync_requested_at < RESYNC_RETRY:
+            return
+        if self.is_connected:
+            self.resync_requested_at = now
+            message = {
+                "type": "resync",
+                "game_id": self.game_id.get()
+            }
+            self.network.send(message)
 
     def start_game_ui(self):
         """Initialise l'interface de jeu"""
@@ -353,7 +443,7 @@ class ClientApp:
                 "direction": direction,
                 "game_id": self.game_id.get()
             }
-            self.network.socket.send(json.dumps(message).encode())
+            self.network.send(message)
 
     def add_message(self, message):
         self.chat_text.config(state='normal')
@@ -378,9 +468,11 @@ class ClientApp:
 
 
 class GameUI:
-    def __init__(self, parent):
+    def __init__(self, parent, size: int = 7):
         self.frame = ttk.Frame(parent)
         self.frame.grid()
+        self.size = size
+        self.grid_frame = None
         self.grid_cells = []
         self.role_label = None
         self.setup_ui()
@@ -390,30 +482,15 @@ class GameUI:
         container = ttk.Frame(self.frame)
         container.grid(row=0, column=0, padx=10, pady=10)
 
-        # Grille de jeu (7x7)
-        grid_frame = ttk.Frame(container)
-        grid_frame.grid(row=0, column=0, padx=10, pady=10)
+        # Grille de jeu (size x size)
+        self.grid_frame = ttk.Frame(container)
+        self.grid_frame.grid(row=0, column=0, padx=10, pady=10)
 
         # Style pour les cellules
         style = ttk.Style()
         style.configure('Cell.TLabel', font=('TkDefaultFont', 12, 'bold'), padding=5)
 
-        # Création de la grille 7x7
-        self.grid_cells = []
-        for i in range(7):  # Changé de 5 à 7
-            row = []
-            for j in range(7):  # Changé de 5 à 7
-                cell = ttk.Label(
-                    grid_frame, 
-                    text='', 
-                    width=3, 
-                    style='Cell.TLabel',
-                    borderwidth=1, 
-                    relief="solid"
-                )
-                cell.grid(row=i, column=j, padx=1, pady=1)
-                row.append(cell)
-            self.grid_cells.append(row)
+        self.build_grid()
 
         # Frame pour le rôle
         role_frame = ttk.Frame(container)
@@ -449,8 +526,40 @@ class GameUI:
                 )
                 btn.grid(row=row, column=col, padx=2, pady=2)
 
+    def build_grid(self):
+        """Crée les cellules de la grille selon la taille courante"""
+        for row in self.grid_cells:
+            for cell in row:
+                cell.destroy()
+
+        self.grid_cells = []
+        for i in range(self.size):
+            row = []
+            for j in range(self.size):
+                cell = ttk.Label(
+                    self.grid_frame, 
+                    text='', 
+                    width=3, 
+                    style='Cell.TLabel',
+                    borderwidth=1, 
+                    relief="solid"
+                )
+                cell.grid(row=i, column=j, padx=1, pady=1)
+                row.append(cell)
+            self.grid_cells.append(row)
+
+    def resize(self, size: int):
+        """Reconstruit la grille si le serveur annonce une autre taille"""
+        if size != self.size:
+            self.size = size
+            self.build_grid()
+
     def update_grid(self, environment: List[str]):
         """Met à jour l'affichage de la grille"""
+        self.update_cells(environment, range(min(len(environment), self.size * self.size)))
+
+    def update_cells(self, environment: List[str], indices):
+        """Met à jour uniquement les cases indiquées"""
         symbols = {
         'L': 'L',    # Loup
         'V': 'V',    # Villageois
@@ -460,35 +569,35 @@ class GameUI:
         'X': ' '     # Hors limites
         }
         
-        size = 7
-        for i in range(size):
-            for j in range(size):
-                index = i * size + j
-                if index < len(environment):
-                    symbol = symbols.get(environment[index], '?')
-                    
-                    if symbol == 'L':
-                        cell_style = {'foreground': 'red', 'text': symbol}
-                    elif symbol == 'V':
-                        cell_style = {'foreground': 'blue', 'text': symbol}
-                    elif symbol == 'P':
-                        if self.role_label.cget("text") == "Mort":
-                            cell_style = {'foreground': 'gray', 'text': '†'}
-                        else:
-                            cell_style = {'foreground': 'green', 'text': symbol}
-                    elif symbol == '■':
-                        cell_style = {'foreground': 'black', 'text': symbol}
-                    elif symbol == '.':
-                        cell_style = {'foreground': 'grey', 'text': symbol}
-                    else:
-                        cell_style = {'foreground': 'black', 'text': symbol}
-                    
-                    self.grid_cells[i][j].configure(**cell_style)
+        size = self.size
+        for index in indices:
+            i, j = divmod(index, size)
+            symbol = symbols.get(environment[index], '?')
+            
+            if symbol == 'L':
+                cell_style = {'foreground': 'red', 'text': symbol}
+            elif symbol == 'V':
+                cell_style = {'foreground': 'blue', 'text': symbol}
+            elif symbol == 'P':
+                if self.role_label.cget("text") == "Mort":
+                    cell_style = {'foreground': 'gray', 'text': '†'}
+                else:
+                    cell_style = {'foreground': 'green', 'text': symbol}
+            elif symbol == '■':
+                cell_style = {'foreground': 'black', 'text': symbol}
+            elif symbol == '.':
+                cell_style = {'foreground': 'grey', 'text': symbol}
+            else:
+                cell_style = {'foreground': 'black', 'text': symbol}
+            
+            self.grid_cells[i][j].configure(**cell_style)
 
     def set_status(self, status: str):
         """Met à jour le status du joueur"""
         if status == "dead":
             self.role_label.configure(text="MORT", foreground='gray')
+        elif status == "spectator":
+            self.role_label.configure(text="Spectateur", foreground='gray')
 
     def set_role(self, role: str):
         """Met à jour l'affichage du rôle"""
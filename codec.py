@@ -0,0 +1,300 @@
+import json
+import struct
+from typing import Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # Dépendance optionnelle
+    msgpack = None
+
+# Champs dont la valeur peut être sérialisée une seule fois et partagée entre destinataires.
+# Côté serveur, "environment" est la vue brute (bytes, un caractère par case).
+SHARED_FIELDS = ("environment", "changes", "current_player")
+
+
+class CodecError(Exception):
+    """Contenu de trame qu'aucun codec ne sait décoder"""
+
+
+def as_message(value) -> dict:
+    """Vérifie qu'un contenu décodé est bien un message (objet JSON / map msgpack)"""
+    if not isinstance(value, dict):
+        raise CodecError(f"Message attendu, reçu: {type(value).__name__}")
+    return value
+
+
+class Codec:
+    """Interface commune des codecs.
+
+    encode_field() sérialise la valeur d'un champ partageable, encode_parts()
+    assemble un message à partir de champs simples et de fragments déjà encodés.
+    """
+
+    name = ""
+
+    def encode_field(self, field: str, value) -> bytes:
+        raise NotImplementedError
+
+    def encode_parts(self, fields: dict, shared: Dict[str, bytes]) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, payload: bytes) -> dict:
+        raise NotImplementedError
+
+    def encode(self, message: dict) -> bytes:
+        """Sérialise un message complet"""
+        fields = {}
+        shared = {}
+        splittable = str(message.get("type", "")).startswith("game_state")
+        for key, value in message.items():
+            if splittable and key in SHARED_FIELDS:
+                shared[key] = self.encode_field(key, value)
+            else:
+                fields[key] = value
+        return self.encode_parts(fields, shared)
+
+
+class JsonCodec(Codec):
+    """Codec par défaut : JSON UTF-8"""
+
+    name = "json"
+
+    def encode_field(self, field: str, value) -> bytes:
+        if field == "environment" and isinstance(value, (bytes, bytearray)):
+            value = list(value.decode())
+        return json.dumps(value).encode()
+
+    def encode_parts(self, fields: dict, shared: Dict[str, bytes]) -> bytes:
+        body = json.dumps(fields).encode()
+        if not shared:
+            return body
+        items = [body[1:-1]] if fields else []
+        items.extend(json.dumps(key).encode() + b': ' + fragment for key, fragment in shared.items())
+        return b'{' + b', '.join(items) + b'}'
+
+    def decode(self, payload: bytes) -> dict:
+        return as_message(json.loads(payload))
+
+
+# Types de messages du codec compact (un octet en tête de trame)
+TYPE_TAGS = {
+    "game_state": 1,
+    "game_state_delta": 2,
+    "chat": 3,
+    "player_list": 4,
+    "role_assignment": 5,
+    "error": 6,
+    "connection": 7,
+    "message": 8,
+    "move": 9,
+    "start_game": 10,
+    "disconnect": 11,
+    "resync": 12,
+    "codec": 13,
+    "chat_batch": 14,
+    "session": 15,
+    "matched": 16,
+    "ping": 17,
+    "pong": 18,
+}
+TAG_TYPES = {tag: message_type for message_type, tag in TYPE_TAGS.items()}
+GENERIC_TAG = 0  # Type inconnu : le JSON complet suit
+
+STATE = struct.Struct('!BBIH')  # tag, flags, seq, size
+DELTA = struct.Struct('!BBBI')  # tag, champs présents, flags, seq
+CHANGE = struct.Struct('!IB')   # index de la case, caractère
+NAME_LENGTH = struct.Struct('!H')
+
+FLAG_YOUR_TURN = 1
+FLAG_DEAD = 2
+FLAG_SPECTATOR = 4
+HAS_TURN = 1
+HAS_STATUS = 2
+HAS_CURRENT_PLAYER = 4
+
+
+class CompactCodec(Codec):
+    """Codec binaire compact.
+
+    Chaque trame commence par un octet de type. game_state et game_state_delta
+    sont empaquetés avec struct : la grille est envoyée brute (un octet par case)
+    et chaque changement tient sur 5 octets. Les autres messages sont suivis
+    de leurs champs en JSON, sans la clé "type".
+    """
+
+    name = "compact"
+
+    def encode_field(self, field: str, value) -> bytes:
+        if field == "environment":
+            return bytes(value) if isinstance(value, (bytes, bytearray)) else ''.join(value).encode()
+        if field == "changes":
+            return b''.join(CHANGE.pack(index, ord(char)) for index, char in value)
+        if field == "current_player":
+            name = str(value).encode()
+            return NAME_LENGTH.pack(len(name)) + name
+        return json.dumps(value).encode()
+
+    def encode_parts(self, fields: dict, shared: Dict[str, bytes]) -> bytes:
+        message_type = fields.get("type")
+
+        if message_type == "game_state":
+            flags = self.flags(fields)
+            return (STATE.pack(TYPE_TAGS[message_type], flags, fields["seq"], fields["size"])
+                    + self.part(fields, shared, "current_player")
+                    + self.part(fields, shared, "environment"))
+
+        if message_type == "game_state_delta":
+            present = 0
+            if "is_your_turn" in fields:
+                present |= HAS_TURN
+            if "player_status" in fields:
+                present |= HAS_STATUS
+            has_current = "current_player" in fields or "current_player" in shared
+            if has_current:
+                present |= HAS_CURRENT_PLAYER
+            header = DELTA.pack(TYPE_TAGS[message_type], present, self.flags(fields), fields["seq"])
+            current = self.part(fields, shared, "current_player") if has_current else b''
+            return header + current + self.part(fields, shared, "changes")
+
+        # Message générique : tag + champs restants en JSON
+        rest = {key: value for key, value in fields.items() if key != "type"}
+        tag = TYPE_TAGS.get(message_type)
+        if tag is None:
+            return bytes([GENERIC_TAG]) + json.dumps(dict(rest, type=message_type)).encode()
+        return bytes([tag]) + json.dumps(rest).encode()
+
+    def part(self, fields: dict, shared: Dict[str, bytes], field: str) -> bytes:
+        if field in shared:
+            return shared[field]
+        return self.encode_field(field, fields.get(field, b'' if field == "environment" else []))
+
+    @staticmethod
+    def flags(fields: dict) -> int:
+        flags = 0
+        if fields.get("is_your_turn"):
+            flags |= FLAG_YOUR_TURN
+        if fields.get("player_status") == "dead":
+            flags |= FLAG_DEAD
+        elif fields.get("player_status") == "spectator":
+            flags |= FLAG_SPECTATOR
+        return flags
+
+    def decode(self, payload: bytes) -> dict:
+        tag = payload[0]
+
+        if tag == TYPE_TAGS["game_state"]:
+            _, flags, seq, size = STATE.unpack_from(payload)
+            current_player, offset = self.read_name(payload, STATE.size)
+            message = {"type": "game_state", "seq": seq, "size": size}
+            message.update(self.read_flags(flags))
+            message["current_player"] = current_player
+            message["environment"] = list(payload[offset:].decode())
+            return message
+
+        if tag == TYPE_TAGS["game_state_delta"]:
+            _, present, flags, seq = DELTA.unpack_from(payload)
+            message = {"type": "game_state_delta", "seq": seq}
+            state = self.read_flags(flags)
+            if present & HAS_TURN:
+                message["is_your_turn"] = state["is_your_turn"]
+            if present & HAS_STATUS:
+                message["player_status"] = state["player_status"]
+            offset = DELTA.size
+            if present & HAS_CURRENT_PLAYER:
+                message["current_player"], offset = self.read_name(payload, offset)
+            message["changes"] = [[index, chr(char)] for index, char in CHANGE.iter_unpack(payload[offset:])]
+            return message
+
+        body = as_message(json.loads(payload[1:]) if len(payload) > 1 else {})
+        if tag == GENERIC_TAG:
+            return body
+        if tag not in TAG_TYPES:
+            raise CodecError(f"Type de message inconnu: {tag}")
+        body["type"] = TAG_TYPES[tag]
+        return body
+
+    @staticmethod
+    def read_flags(flags: int) -> dict:
+        return {
+            "is_your_turn": bool(flags & FLAG_YOUR_TURN),
+            "player_status": "dead" if flags & FLAG_DEAD else "spectator" if flags & FLAG_SPECTATOR else "alive"
+        }
+
+    @staticmethod
+    def read_name(payload: bytes, offset: int):
+        (length,) = NAME_LENGTH.unpack_from(payload, offset)
+        start = offset + NAME_LENGTH.size
+        return payload[start:start + length].decode(), start + length
+
+
+class MsgpackCodec(Codec):
+    """Codec msgpack (seulement si le module msgpack est installé)"""
+
+    name = "msgpack"
+
+    def encode_field(self, field: str, value) -> bytes:
+        if field == "environment" and not isinstance(value, (bytes, bytearray)):
+            value = ''.join(value).encode()
+        return msgpack.packb(bytes(value) if field == "environment" else value)
+
+    def encode_parts(self, fields: dict, shared: Dict[str, bytes]) -> bytes:
+        # Une map msgpack est un en-tête suivi des paires clé/valeur : on peut y insérer les fragments
+        count = len(fields) + len(shared)
+        if count < 16:
+            header = bytes([0x80 | count])
+        else:
+            header = struct.pack('!BH', 0xde, count)
+        items = [msgpack.packb(key) + msgpack.packb(value) for key, value in fields.items()]
+        items.extend(msgpack.packb(key) + fragment for key, fragment in shared.items())
+        return header + b''.join(items)
+
+    def decode(self, payload: bytes) -> dict:
+        try:
+            message = as_message(msgpack.unpackb(payload, raw=False))
+        except (ValueError, TypeError, msgpack.UnpackException) as e:
+            raise CodecError(f"Trame msgpack invalide: {str(e)}")
+        if isinstance(message.get("environment"), bytes):
+            message["environment"] = list(message["environment"].decode())
+        return message
+
+
+JSON_CODEC = JsonCodec()
+COMPACT_CODEC = CompactCodec()
+CODECS: Dict[str, Codec] = {JSON_CODEC.name: JSON_CODEC, COMPACT_CODEC.name: COMPACT_CODEC}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+
+
+def supported_codecs() -> List[str]:
+    """Codecs proposés par ce pair, du plus au moins préféré"""
+    return [name for name in ("compact", "msgpack", "json") if name in CODECS]
+
+
+def negotiate_codec(offered) -> Codec:
+    """Choisit le premier codec proposé par le client que l'on sait utiliser"""
+    if isinstance(offered, list):
+        for name in offered:
+            codec = CODECS.get(name) if isinstance(name, str) else None
+            if codec is not None:
+                return codec
+    return JSON_CODEC
+
+
+def decode_payload(payload: bytes) -> dict:
+    """Décode une trame quel que soit son codec.
+
+    Les trois formats se distinguent par leur premier octet : '{' pour JSON,
+    0x80 et plus pour une map msgpack, un petit tag pour le codec compact.
+    Chaque pair peut donc toujours lire ce qu'il reçoit, même pendant la négociation.
+    """
+    if not payload:
+        raise CodecError("Trame vide")
+    first = payload[0]
+    if first == 0x7b:  # '{'
+        return JSON_CODEC.decode(payload)
+    if first >= 0x80:
+        codec: Optional[Codec] = CODECS.get(MsgpackCodec.name)
+        if codec is None:
+            raise CodecError("Trame msgpack reçue mais msgpack n'est pas installé")
+        return codec.decode(payload)
+    return COMPACT_CODEC.decode(payload)
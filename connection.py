@@ -0,0 +1,222 @@
+import asyncio
+import collections
+import socket
+import threading
+from typing import Deque, Tuple
+from metrics import REGISTRY
+from protocol import MAX_FRAME_SIZE
+
+# Catégories de trames, pour choisir quoi sacrifier quand un client ne suit pas
+CONTROL = "control"  # rôle, liste des joueurs, erreurs... : jamais abandonnées
+STATE = "state"      # game_state / game_state_delta : remplaçables par un état plus récent
+CHAT = "chat"        # messages de chat : abandonnables
+
+# Politiques appliquées quand la file d'envoi d'un client est pleine :
+# - coalesce : abandonne les états en attente (le client comble le trou par un resync), puis le chat
+# - drop-chat : abandonne le chat en attente et le nouveau message de chat
+# - disconnect : déconnecte immédiatement le client trop lent
+# Si la place libérée ne suffit pas, le client est déconnecté.
+OVERFLOW_POLICIES = ("coalesce", "drop-chat", "disconnect")
+MAX_QUEUE_BYTES = 4 * MAX_FRAME_SIZE
+
+FRAMES_SENT = REGISTRY.counter("loupgarou_frames_sent_total", "Trames mises en file d'envoi")
+BYTES_SENT = REGISTRY.counter("loupgarou_bytes_sent_total", "Octets envoyés aux clients")
+SEND_FAILURES = REGISTRY.counter("loupgarou_send_failures_total", "Envois échoués vers un client")
+DROPPED_FRAMES = REGISTRY.counter("loupgarou_dropped_frames_total",
+                                  "Trames abandonnées car la file du client était pleine", ("kind",))
+SLOW_CONSUMERS = REGISTRY.counter("loupgarou_slow_consumer_disconnects_total",
+                                  "Clients déconnectés car leur file d'envoi débordait")
+
+
+class OutboundQueue:
+    """File d'envoi bornée (en octets) d'un client.
+
+    push() applique la politique de débordement et renvoie False si le client
+    doit être déconnecté. pop_all() vide la file en une seule écriture.
+    """
+
+    def __init__(self, max_bytes: int = MAX_QUEUE_BYTES, policy: str = "coalesce"):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique inconnue: {policy} (choix: {', '.join(OVERFLOW_POLICIES)})")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.frames: Deque[Tuple[str, bytes]] = collections.deque()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def push(self, data: bytes, kind: str = CONTROL) -> bool:
+        # Une trame seule est toujours acceptée, même plus grande que la limite
+        if self.frames and self.size + len(data) > self.max_bytes:
+            if self.policy == "disconnect":
+                return False
+            if self.policy == "coalesce":
+                self.discard(STATE)
+            if self.size + len(data) > self.max_bytes:
+                self.discard(CHAT)
+            if self.size + len(data) > self.max_bytes:
+                if kind == CHAT:
+                    DROPPED_FRAMES.inc(1, (kind,))
+                    return True
+                return False
+        self.frames.append((kind, data))
+        self.size += len(data)
+        FRAMES_SENT.inc()
+        return True
+
+    def discard(self, kind: str) -> None:
+        """Retire de la file toutes les trames d'une catégorie"""
+        kept = collections.deque(frame for frame in self.frames if frame[0] != kind)
+        dropped = len(self.frames) - len(kept)
+        if dropped:
+            DROPPED_FRAMES.inc(dropped, (kind,))
+            self.frames = kept
+            self.size = sum(len(data) for _, data in kept)
+
+    def pop_all(self) -> bytes:
+        data = b''.join(data for _, data in self.frames)
+        self.frames.clear()
+        self.size = 0
+        return data
+
+
+class SocketConnection:
+    """Socket du moteur threading avec une file d'envoi vidée par un thread d'écriture.
+
+    Les rooms ne bloquent donc jamais sur un client lent : elles ajoutent la trame
+    à sa file et passent au suivant.
+    """
+
+    def __init__(self, sock: socket.socket, max_queue_bytes: int = MAX_QUEUE_BYTES,
+                 policy: str = "coalesce"):
+        self.sock = sock
+        self.queue = OutboundQueue(max_queue_bytes, policy)
+        self.ready = threading.Condition()
+        self.closed = False
+        self.writer = threading.Thread(target=self.run_writer, daemon=True)
+        self.writer.start()
+
+    def send_frame(self, data: bytes, kind: str = CONTROL) -> None:
+        with self.ready:
+            if self.closed:
+                return
+            if self.queue.push(data, kind):
+                self.ready.notify()
+                return
+        SLOW_CONSUMERS.inc()
+        print(f"Client trop lent, déconnexion: {self.getpeername()}")
+        self.close()
+
+    def sendall(self, data: bytes) -> None:
+        self.send_frame(data)
+
+    def recv(self, size: int) -> bytes:
+        if self.closed:
+            return b""
+        try:
+            return self.sock.recv(size)
+        except OSError:
+            if self.closed:
+                return b""  # Fermée par le serveur pendant la lecture (départ, remplacement)
+            raise
+
+    def getpeername(self):
+        try:
+            return self.sock.getpeername()
+        except OSError:
+            return None
+
+    def run_writer(self) -> None:
+        while True:
+            with self.ready:
+                while not self.queue and not self.closed:
+                    self.ready.wait()
+                if self.closed:
+                    return
+                data = self.queue.pop_all()
+            try:
+                self.sock.sendall(data)
+            except OSError as e:
+                if not self.closed:  # Sinon l'erreur vient de notre propre fermeture
+                    SEND_FAILURES.inc()
+                    print(f"Erreur d'envoi: {str(e)}")
+                    self.close()
+                return
+            BYTES_SENT.inc(len(data))
+
+    def close(self, abort: bool = False) -> None:
+        # abort : même interface que StreamConnection, shutdown() n'attend déjà pas le client
+        with self.ready:
+            if self.closed:
+                return
+            self.closed = True
+            self.ready.notify()
+        try:
+            # Débloque le thread de lecture (recv) et le thread d'écriture (sendall)
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class StreamConnection:
+    """Adapte un couple (reader, writer) asyncio à l'interface utilisée par GameRoom.
+
+    Les trames passent par une file bornée vidée par une tâche d'écriture qui
+    attend drain() : un client lent ne fait plus grossir le tampon du transport
+    sans limite.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 max_queue_bytes: int = MAX_QUEUE_BYTES, policy: str = "coalesce"):
+        self.reader = reader
+        self.writer = writer
+        self.queue = OutboundQueue(max_queue_bytes, policy)
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.writer_task = asyncio.get_running_loop().create_task(self.run_writer())
+
+    def send_frame(self, data: bytes, kind: str = CONTROL) -> None:
+        # Toujours appelé depuis la boucle asyncio (acteurs des rooms, traitement des messages)
+        if self.closed:
+            return
+        if self.queue.push(data, kind):
+            self.ready.set()
+            return
+        SLOW_CONSUMERS.inc()
+        print(f"Client trop lent, déconnexion: {self.getpeername()}")
+        self.close(abort=True)
+
+    def sendall(self, data: bytes) -> None:
+        self.send_frame(data)
+
+    def getpeername(self):
+        return self.writer.get_extra_info('peername')
+
+    async def run_writer(self) -> None:
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                if self.closed:
+                    return
+                data = self.queue.pop_all()
+                self.writer.write(data)
+                await self.writer.drain()
+                BYTES_SENT.inc(len(data))
+        except ConnectionError as e:
+            SEND_FAILURES.inc()
+            print(f"Erreur d'envoi: {str(e)}")
+            self.close(abort=True)
+
+    def close(self, abort: bool = False) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.ready.set()
+        if abort:
+            # close() attendrait que le client lise ce qui reste dans le tampon du transport
+            self.writer.transport.abort()
+        else:
+            self.writer.close()
@@ -0,0 +1,89 @@
+import itertools
+import json
+import os
+import re
+import time
+from typing import Iterator, Optional
+from protocol import RECV_SIZE, FrameDecoder, encode_frame
+
+EVENT_LOG_VERSION = 1
+BUFFER_SIZE = 64 * 1024
+FLUSH_INTERVAL = 1.0  # Au plus une seconde d'événements perdue en cas d'arrêt brutal
+LOG_NUMBERS = itertools.count()  # Distingue les journaux créés dans la même seconde
+
+# Événements enregistrés, chacun sous la forme [ms depuis l'ouverture, type, arguments...] :
+#   log        version
+#   create     game_id, size, mode, seed   graine du random.Random de la room
+#   join       name
+#   leave      name
+#   start      [noms dans l'ordre de placement]
+#   move       name, direction              coup accepté (mode tour par tour)
+#   tick       {name: direction}            coups résolus ensemble (mode temps réel)
+#   skip       name                         tour passé faute de coup
+#   death      name
+#   restore    turn_number                  room reprise d'un snapshot (voir snapshot.py)
+
+
+class EventLog:
+    """Journal d'une room en ajout seul.
+
+    Chaque événement est une liste JSON compacte dans une trame préfixée par sa
+    longueur (même découpage que le protocole réseau), écrite via un tampon et
+    vidée au plus toutes les FLUSH_INTERVAL secondes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "ab", buffering=BUFFER_SIZE)
+        self.started = time.monotonic()
+        self.last_flush = self.started
+        self.record("log", EVENT_LOG_VERSION)
+
+    def record(self, event: str, *args) -> None:
+        now = time.monotonic()
+        payload = json.dumps([round((now - self.started) * 1000), event, *args], separators=(",", ":"))
+        self.file.write(encode_frame(payload.encode()))
+        if now - self.last_flush >= FLUSH_INTERVAL:
+            self.file.flush()
+            self.last_flush = now
+
+    def flush(self) -> int:
+        """Vide le tampon et renvoie la taille du journal (position d'un snapshot)"""
+        self.file.flush()
+        self.last_flush = time.monotonic()
+        return self.file.tell()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.close()
+
+
+def open_room_log(directory: str, game_id: str) -> EventLog:
+    """Crée le journal d'une nouvelle room dans directory"""
+    os.makedirs(directory, exist_ok=True)
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(game_id))[:64]
+    path = os.path.join(directory, f"{safe_id}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(LOG_NUMBERS)}.events")
+    return EventLog(path)
+
+
+def resume_room_log(path: str, offset: int) -> EventLog:
+    """Rouvre le journal d'une room restaurée, tronqué à la position de son snapshot.
+
+    Les événements écrits après le snapshot ne se sont plus produits une fois la
+    room restaurée : ils sont retirés pour que le journal reste rejouable.
+    """
+    if os.path.exists(path) and os.path.getsize(path) > offset:
+        os.truncate(path, offset)
+    return EventLog(path)
+
+
+def read_events(path: str, max_frame_size: Optional[int] = None) -> Iterator[list]:
+    """Relit les événements d'un journal, dans l'ordre"""
+    decoder = FrameDecoder(max_frame_size) if max_frame_size else FrameDecoder()
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(RECV_SIZE)
+            if not data:
+                return
+            for frame in decoder.feed(data):
+                yield json.loads(frame)
@@ -1,21 +1,97 @@
+import base64
+import functools
 import random
-from typing import Dict, List, Tuple
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_SIZE = 7
+MIN_SIZE = 5
+MAX_SIZE = 256
+
+# Codes des cases de la grille (un octet par case)
+EMPTY = 0
+WALL = 1
+WOLF = 2
+VILLAGER = 3
+
+# Caractère envoyé aux clients pour chaque code
+CELL_CHARS = ' #LV'
+CELL_TABLE = bytes.maketrans(bytes(range(len(CELL_CHARS))), CELL_CHARS.encode())
+# Même table mais les joueurs sont masqués (brouillard)
+FOG_TABLE = bytes.maketrans(bytes(range(len(CELL_CHARS))), b' #  ')
+
+# Rayon de vision (distance Manhattan) selon le rôle
+VISION_RADIUS = {'loup': 2, 'villageois': 1}
+# Décalages (dx, dy, distance) de toutes les cases visibles depuis une position, au rayon maximal
+MAX_VISION_RADIUS = max(VISION_RADIUS.values())
+VISION_OFFSETS = [(dx, dy, abs(dx) + abs(dy))
+                  for dy in range(-MAX_VISION_RADIUS, MAX_VISION_RADIUS + 1)
+                  for dx in range(-MAX_VISION_RADIUS, MAX_VISION_RADIUS + 1)
+                  if abs(dx) + abs(dy) <= MAX_VISION_RADIUS]
+
+
+def is_valid_size(size) -> bool:
+    """Vérifie qu'une taille de carte demandée par un client est acceptable"""
+    return isinstance(size, int) and not isinstance(size, bool) and MIN_SIZE <= size <= MAX_SIZE
+
+
+def draw_roles(player_names: List[str], rng: random.Random = None) -> Dict[str, str]:
+    """Tire les rôles : 1 loup pour 4 joueurs (au moins un), les autres villageois"""
+    names = list(player_names)
+    nb_wolves = max(1, len(names) // 4)
+    (rng or random).shuffle(names)
+    return {name: "loup" if i < nb_wolves else "villageois" for i, name in enumerate(names)}
+
+
+@functools.lru_cache(maxsize=32)
+def grid_template(size: int) -> Tuple[bytes, bytes, array, array]:
+    """Grille vide d'une taille donnée, calculée une fois et copiée par chaque partie.
+
+    Renvoie (grille, vue de base, cases libres, position de chaque case dans les cases libres).
+    """
+    # Grille compacte : size*size codes, indexée par y * size + x, avec des murs sur les bords
+    wall_row = bytes([WALL]) * size
+    inner_row = bytes([WALL]) + bytes([EMPTY]) * (size - 2) + bytes([WALL])
+    grid = wall_row + inner_row * (size - 2) + wall_row
+    free_cells = array('i', (i for i, cell in enumerate(grid) if cell == EMPTY))
+    free_slots = array('i', [-1]) * len(grid)
+    for slot, index in enumerate(free_cells):
+        free_slots[index] = slot
+    return grid, grid.translate(FOG_TABLE), free_cells, free_slots
+
 
 class GameLogic:
-    def __init__(self, size: int = 7):  # Changé de 10 à 7
+    def __init__(self, size: int = DEFAULT_SIZE, rng: random.Random = None):
         self.size = size
-        # Création de la grille avec des murs sur les bords
-        self.grid = []
-        for y in range(size):
-            row = []
-            for x in range(size):
-                # Si on est sur un bord, on met un mur
-                if x == 0 or x == size-1 or y == 0 or y == size-1:
-                    row.append('#')
-                else:
-                    row.append(' ')
-            self.grid.append(row)
+        # Générateur propre à la partie : avec la même graine, la partie se rejoue à l'identique
+        self.rng = rng or random.Random()
+        grid, base_view, free_cells, free_slots = grid_template(size)
+        self.grid = bytearray(grid)
+        # Vue sans aucun joueur : ne change jamais puisque les murs sont fixes
+        self.base_view = base_view
+        # Cases libres : liste compacte (retrait par échange avec la dernière) + position
+        # de chaque case dans cette liste (-1 si occupée), pour un tirage aléatoire en O(1)
+        self.free_cells = free_cells[:]
+        self.free_slots = free_slots[:]
         self.players: Dict[str, dict] = {}
+        # Index position -> nom du joueur vivant qui l'occupe (collisions en O(1))
+        self.positions: Dict[Tuple[int, int], str] = {}
+        # Cases modifiées depuis le dernier take_dirty() : seules les vues qui les
+        # contiennent sont à recalculer
+        self.dirty: Set[int] = set()
+        self.current_turn = None
+        self.game_started = False
+
+    def reset(self, rng: random.Random = None) -> None:
+        """Remet la partie à zéro en réutilisant la grille et les tableaux déjà alloués"""
+        grid, _, free_cells, free_slots = grid_template(self.size)
+        self.rng = rng or random.Random()
+        self.grid[:] = grid
+        self.free_cells[:] = free_cells
+        self.free_slots[:] = free_slots
+        self.players.clear()
+        self.positions.clear()
+        self.dirty.clear()
         self.current_turn = None
         self.game_started = False
 
@@ -31,54 +107,145 @@ class GameLogic:
             'role': role,
             'status': 'alive'
         }
-        self.grid[y][x] = 'L' if role == 'loup' else 'V'
+        self.set_cell(y * self.size + x, WOLF if role == 'loup' else VILLAGER)
+        self.positions[(x, y)] = player_name
         return True
 
+    def set_cell(self, index: int, code: int) -> None:
+        """Modifie une case en tenant à jour la liste des cases libres"""
+        was_free = self.grid[index] == EMPTY
+        self.grid[index] = code
+        self.dirty.add(index)
+        if code == EMPTY and not was_free:
+            self.free_slots[index] = len(self.free_cells)
+            self.free_cells.append(index)
+        elif code != EMPTY and was_free:
+            # Retrait en O(1) : la dernière case libre prend la place de celle-ci
+            slot = self.free_slots[index]
+            last = self.free_cells.pop()
+            if last != index:
+                self.free_cells[slot] = last
+                self.free_slots[last] = slot
+            self.free_slots[index] = -1
+
+    def move_cell(self, old: int, new: int) -> None:
+        """Déplace le contenu d'une case vers une autre, en tenant à jour les cases libres"""
+        code = self.grid[old]
+        if old == new:
+            return
+        slot = self.free_slots[new]
+        if slot < 0:
+            self.set_cell(old, EMPTY)
+            self.set_cell(new, code)
+            return
+        # Cas courant (case d'arrivée libre) : l'ancienne case reprend directement sa place
+        self.grid[new] = code
+        self.grid[old] = EMPTY
+        self.dirty.add(old)
+        self.dirty.add(new)
+        self.free_cells[slot] = old
+        self.free_slots[old] = slot
+        self.free_slots[new] = -1
+
+    def get_cell(self, x: int, y: int) -> int:
+        """Renvoie le code d'une case"""
+        return self.grid[y * self.size + x]
+
+    def get_player_at(self, x: int, y: int) -> Optional[str]:
+        """Renvoie le joueur vivant présent sur une case, ou None"""
+        return self.positions.get((x, y))
+
+    def kill_player(self, player_name: str) -> None:
+        """Marque un joueur comme mort et le retire de la grille"""
+        player = self.players[player_name]
+        player['status'] = 'dead'
+        x, y = player['position']
+        if self.positions.get((x, y)) == player_name:
+            del self.positions[(x, y)]
+            self.set_cell(y * self.size + x, EMPTY)
+
     def get_random_empty_position(self) -> Tuple[int, int]:
-        """Trouve une position vide aléatoire sur la grille"""
-        empty_positions = [
-            (x, y) for x in range(self.size)
-            for y in range(self.size)
-            if self.grid[y][x] == ' '
-        ]
-        return random.choice(empty_positions)
+        """Trouve une position vide aléatoire sur la grille (O(1))"""
+        if not self.free_cells:
+            raise IndexError("Plus aucune case libre sur la grille")
+        index = self.free_cells[self.rng.randrange(len(self.free_cells))]
+        return (index % self.size, index // self.size)
 
     def move_player(self, player_name: str, direction: int) -> bool:
         """Déplace un joueur dans une direction"""
         if player_name not in self.players or self.players[player_name].get('status') == 'dead':
             return False
 
-        x, y = self.players[player_name]['position']
+        player = self.players[player_name]
+        x, y = player['position']
         new_x, new_y = self.get_new_position(x, y, direction)
 
-        if self.is_valid_move(new_x, new_y, player_name):  # Ajout de player_name
-            # Vérifie s'il y a une collision avec un autre joueur
-            for other_name, other_player in self.players.items():
-                if other_name != player_name:
-                    other_x, other_y = other_player['position']
-                    if (new_x, new_y) == (other_x, other_y):
-                        # Si un loup rencontre un villageois
-                        if self.players[player_name]['role'] == 'loup' and \
-                        other_player['role'] == 'villageois' and \
-                        other_player['status'] == 'alive':
-                            other_player['status'] = 'dead'
-                            # On enlève le villageois mort de la grille
-                            self.grid[other_y][other_x] = ' '
-                            # On efface l'ancienne position du loup
-                            self.grid[y][x] = ' '
-                            # On déplace le loup sur la position du villageois mort
-                            self.grid[new_y][new_x] = 'L'
-                            self.players[player_name]['position'] = (new_x, new_y)
-                            return True
-
-            # Si pas de collision, mouvement normal
-            self.grid[y][x] = ' '
-            if self.players[player_name]['status'] == 'alive':
-                self.grid[new_y][new_x] = 'L' if self.players[player_name]['role'] == 'loup' else 'V'
-            self.players[player_name]['position'] = (new_x, new_y)
-            return True
+        if not self.is_valid_move(new_x, new_y, player_name):
+            return False
+
+        # Si un loup arrive sur un villageois, il le tue et prend sa place
+        other_name = self.positions.get((new_x, new_y))
+        if other_name is not None and other_name != player_name:
+            self.kill_player(other_name)
+
+        # On efface l'ancienne position puis on place le joueur sur la nouvelle
+        del self.positions[(x, y)]
+        self.move_cell(y * self.size + x, new_y * self.size + new_x)
+        self.positions[(new_x, new_y)] = player_name
+        player['position'] = (new_x, new_y)
+        return True
+
+    def resolve_tick(self, moves: Dict[str, int]) -> List[str]:
+        """Résout simultanément les coups d'un tick (mode temps réel).
+
+        Toutes les cibles sont calculées à partir des positions du début du tick :
+        - une case occupée au début du tick ne peut être prise que par un loup,
+          sur un villageois, qui est tué même s'il tentait de s'enfuir ;
+        - une case libre visée par un loup et des villageois : les villageois sont
+          tués et le loup prend la case ;
+        - plusieurs loups sur la même case (ou sur le même villageois) : seul le
+          premier dans l'ordre alphabétique avance, les autres restent sur place ;
+        - plusieurs villageois seuls sur la même case : aucun ne bouge.
+        Renvoie la liste des joueurs tués pendant le tick.
+        """
+        claims: Dict[Tuple[int, int], List[str]] = {}
+        for name in sorted(moves):
+            player = self.players.get(name)
+            if player is None or player['status'] == 'dead':
+                continue
+            x, y = player['position']
+            target = self.get_new_position(x, y, moves[name])
+            if target != (x, y) and self.is_valid_move(target[0], target[1], name):
+                claims.setdefault(target, []).append(name)
 
-        return False
+        killed = []
+        winners = []
+        for target, names in claims.items():
+            wolves = [name for name in names if self.players[name]['role'] == 'loup']
+            if wolves:
+                occupant = self.positions.get(target)
+                if occupant is not None:
+                    killed.append(occupant)
+                killed.extend(name for name in names if name not in wolves)
+                winners.append((wolves[0], target))
+            elif len(names) == 1 and target not in self.positions:
+                winners.append((names[0], target))
+
+        killed = list(dict.fromkeys(killed))  # Un villageois peut être visé deux fois
+        for name in killed:
+            self.kill_player(name)
+
+        # Les cibles gagnantes sont distinctes et libres une fois les victimes retirées
+        for name, (new_x, new_y) in winners:
+            player = self.players[name]
+            if player['status'] == 'dead':
+                continue
+            x, y = player['position']
+            del self.positions[(x, y)]
+            self.move_cell(y * self.size + x, new_y * self.size + new_x)
+            self.positions[(new_x, new_y)] = name
+            player['position'] = (new_x, new_y)
+        return killed
 
     def get_new_position(self, x: int, y: int, direction: int) -> Tuple[int, int]:
         """Calcule la nouvelle position selon la direction"""
@@ -98,65 +265,124 @@ class GameLogic:
     def is_valid_move(self, x: int, y: int, player_name: str) -> bool:  # Ajout de player_name comme paramètre
         """Vérifie si un déplacement est valide"""
         # Vérifie d'abord les limites et les murs
-        if not (0 <= x < self.size and 0 <= y < self.size and self.grid[y][x] != '#'):
+        if not (0 <= x < self.size and 0 <= y < self.size and self.grid[y * self.size + x] != WALL):
             return False
 
         # Vérifie les collisions avec d'autres joueurs
-        player = self.players[player_name]
-        if player['role'] != 'loup':  # Si ce n'est pas un loup
-            # Vérifie si la case est occupée par un autre joueur
-            for other_name, other_player in self.players.items():
-                if other_name != player_name:  # Ne pas se compter soi-même
-                    other_x, other_y = other_player['position']
-                    if (x, y) == (other_x, other_y) and other_player['status'] == 'alive':
-                        return False  # Case occupée, mouvement invalide pour un villageois
+        other_name = self.positions.get((x, y))
+        if other_name is None or other_name == player_name:
+            return True
 
-        return True  # Si toutes les vérifications sont passées, le mouvement est valide
+        # Seul un loup peut entrer sur une case occupée, et uniquement par un villageois
+        return self.players[player_name]['role'] == 'loup' and \
+            self.players[other_name]['role'] == 'villageois'
 
     def get_environment(self, player_name: str) -> List[str]:
         if player_name not in self.players:
             return []
+        return list(self.get_view(player_name).decode())
+
+    def get_full_view(self) -> bytes:
+        """Grille complète sans brouillard (vue des morts)"""
+        return self.grid.translate(CELL_TABLE)
 
-        x, y = self.players[player_name]['position']
-        role = self.players[player_name]['role']
-        status = self.players[player_name].get('status', 'alive')  # Nouveau : status du joueur
-        environment = []
+    def get_view(self, player_name: str, full_view: bytes = None) -> bytes:
+        """Vue d'un joueur, un caractère par case.
+
+        On part de la vue de base (murs et cases vides, toujours visibles) et on
+        n'examine que les cases dans le rayon de vision : le coût ne dépend pas
+        de la taille de la carte.
+        """
+        player = self.players[player_name]
 
         # Si le joueur est mort, il voit tout
-        if status == 'dead':
-            for i in range(self.size):
-                for j in range(self.size):
-                    environment.append(self.grid[i][j])
-            return environment
-
-        # On parcourt toute la grille
-        for i in range(self.size):
-            for j in range(self.size):
-                # Position actuelle du joueur
-                if i == y and j == x:
-                    environment.append('P')
-                    continue
-
-                # Si c'est un mur, on le voit toujours
-                if self.grid[i][j] == '#':
-                    environment.append('#')
-                    continue
-
-                # Calcul de la distance Manhattan
-                distance = abs(x - j) + abs(y - i)
-
-                # Règles de vision selon le rôle
-                if self.grid[i][j] in ['L', 'V']:
-                    if (role == 'loup' and distance <= 2) or \
-                    (role == 'villageois' and distance <= 1):
-                        environment.append(self.grid[i][j])
-                    else:
-                        environment.append(' ')
-                else:
-                    environment.append(self.grid[i][j])
-
-        return environment
+        if player.get('status', 'alive') == 'dead':
+            return full_view if full_view is not None else self.get_full_view()
+
+        size = self.size
+        grid = self.grid
+        x, y = player['position']
+        radius = VISION_RADIUS.get(player['role'], 0)
+        view = bytearray(self.base_view)
+
+        for i in range(max(0, y - radius), min(size, y + radius + 1)):
+            reach = radius - abs(i - y)
+            row = i * size
+            for j in range(max(0, x - reach), min(size, x + reach + 1)):
+                cell = grid[row + j]
+                if cell == WOLF or cell == VILLAGER:
+                    view[row + j] = ord(CELL_CHARS[cell])
+
+        # Position actuelle du joueur
+        view[y * size + x] = ord('P')
+        return bytes(view)
+
+    def get_views(self, player_names: List[str]) -> Dict[str, bytes]:
+        """Calcule en une passe les vues de plusieurs joueurs (vue complète partagée)"""
+        full_view = None
+        views = {}
+        for name in player_names:
+            if name not in self.players:
+                continue
+            if self.players[name]['status'] == 'dead' and full_view is None:
+                full_view = bytes(self.get_full_view())
+            views[name] = self.get_view(name, full_view)
+        return views
+
+    def take_dirty(self) -> Set[int]:
+        """Renvoie les cases modifiées depuis l'appel précédent et repart de zéro"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def players_seeing(self, cells: Iterable[int]) -> Set[str]:
+        """Joueurs vivants dont le champ de vision contient au moins une des cases.
+
+        On part de chaque case pour chercher les joueurs autour d'elle (index des
+        positions) : le coût dépend du nombre de cases modifiées, pas du nombre
+        de joueurs. Un joueur qui s'est déplacé voit sa nouvelle case, il en fait
+        donc partie.
+        """
+        size = self.size
+        positions = self.positions
+        seeing = set()
+        for index in cells:
+            x, y = index % size, index // size
+            for dx, dy, distance in VISION_OFFSETS:
+                name = positions.get((x + dx, y + dy))
+                if name is not None and distance <= VISION_RADIUS.get(self.players[name]['role'], 0):
+                    seeing.add(name)
+        return seeing
 
     def can_start_game(self) -> bool:
         """Vérifie si la partie peut démarrer"""
-        return len(self.players) >= 4  # Minimum 4 joueurs
\ No newline at end of file
+        return len(self.players) >= 4  # Minimum 4 joueurs
+
+    def snapshot(self) -> dict:
+        """État complet de la grille et des joueurs, sérialisable en JSON"""
+        return {
+            "size": self.size,
+            "grid": base64.b64encode(self.grid).decode(),
+            # L'ordre des cases libres fixe les prochains tirages : il est gardé tel quel
+            "free_cells": base64.b64encode(self.free_cells.tobytes()).decode(),
+            "players": {name: [player['position'][0], player['position'][1], player['role'], player['status']]
+                        for name, player in self.players.items()}
+        }
+
+    @classmethod
+    def restore(cls, data: dict, rng: random.Random = None) -> "GameLogic":
+        """Recrée un GameLogic à partir de snapshot()"""
+        logic = cls(data["size"], rng)
+        grid = base64.b64decode(data["grid"])
+        if len(grid) != len(logic.grid):
+            raise ValueError("Grille incompatible avec la taille enregistrée")
+        logic.grid[:] = grid
+        logic.free_cells = array('i')
+        logic.free_cells.frombytes(base64.b64decode(data["free_cells"]))
+        logic.free_slots = array('i', [-1]) * len(logic.grid)
+        for slot, index in enumerate(logic.free_cells):
+            logic.free_slots[index] = slot
+        for name, (x, y, role, status) in data["players"].items():
+            logic.players[name] = {'position': (x, y), 'role': role, 'status': status}
+            if status == 'alive':
+                logic.positions[(x, y)] = name
+        return logic
@@ -0,0 +1,109 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+from codec import JSON_CODEC
+from connection import CONTROL
+from metrics import REGISTRY
+from protocol import encode_message
+from scheduler import TimerWheel
+
+HEARTBEAT_INTERVAL = 5.0   # Intervalle entre deux pings envoyés à chaque client (s)
+HEARTBEAT_TIMEOUT = 15.0   # Silence au-delà duquel une connexion est considérée morte (s)
+
+RTT_SECONDS = REGISTRY.histogram("loupgarou_rtt_seconds", "Aller-retour ping/pong avec les clients",
+                                 buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+REAPED = REGISTRY.counter("loupgarou_reaped_connections_total",
+                          "Connexions fermées faute de signe de vie (pair mort ou demi-ouvert)")
+
+
+class PeerState:
+    """Dernier signe de vie et dernier aller-retour mesuré d'une connexion"""
+
+    __slots__ = ("last_seen", "ping_id", "ping_sent", "rtt")
+
+    def __init__(self, now: float):
+        self.last_seen = now
+        self.ping_id = None
+        self.ping_sent = None
+        self.rtt: Optional[float] = None
+
+
+class Heartbeats:
+    """Pings applicatifs et ramassage des connexions mortes, pour tout un serveur.
+
+    Un seul timer périodique dans la TimerWheel du serveur parcourt toutes les
+    connexions : il ferme celles qui n'ont rien envoyé depuis timeout secondes
+    et envoie aux autres un ping, encodé une fois pour toutes (en JSON, que
+    tous les clients reconnaissent au premier octet). Le pong donne le RTT.
+    """
+
+    def __init__(self, timers: TimerWheel, interval: float = HEARTBEAT_INTERVAL,
+                 timeout: float = HEARTBEAT_TIMEOUT):
+        self.timers = timers
+        self.interval = interval
+        self.timeout = timeout
+        self.peers: Dict[object, PeerState] = {}
+        self.lock = threading.Lock()
+        self.ping_id = 0
+        # Exécute le balayage là où les connexions peuvent être utilisées (boucle asyncio)
+        self.dispatch: Callable = None
+
+    def start(self, dispatch: Callable = None) -> None:
+        """Lance le balayage périodique (dispatch(func) l'exécute dans le bon thread ; direct par défaut)"""
+        if not self.interval:
+            return
+        self.dispatch = dispatch
+        self.schedule()
+
+    def schedule(self) -> None:
+        if self.dispatch is None:
+            self.timers.schedule(self.interval, self.sweep)
+        else:
+            self.timers.schedule(self.interval, self.dispatch, self.sweep)
+
+    def register(self, connection) -> None:
+        with self.lock:
+            self.peers[connection] = PeerState(time.monotonic())
+
+    def forget(self, connection) -> None:
+        with self.lock:
+            self.peers.pop(connection, None)
+
+    def seen(self, connection) -> None:
+        """Des données viennent d'arriver sur la connexion"""
+        state = self.peers.get(connection)
+        if state is not None:
+            state.last_seen = time.monotonic()
+
+    def pong(self, connection, ping_id) -> None:
+        state = self.peers.get(connection)
+        if state is None or state.ping_sent is None or ping_id != state.ping_id:
+            return  # Réponse à un ping plus ancien
+        state.rtt = time.monotonic() - state.ping_sent
+        state.ping_sent = None
+        RTT_SECONDS.observe(state.rtt)
+
+    def rtt(self, connection) -> Optional[float]:
+        state = self.peers.get(connection)
+        return state.rtt if state is not None else None
+
+    def sweep(self) -> None:
+        """Ferme les connexions silencieuses et envoie un ping aux autres"""
+        try:
+            now = time.monotonic()
+            self.ping_id += 1
+            frame = encode_message({"type": "ping", "id": self.ping_id, "interval": self.interval}, JSON_CODEC)
+            with self.lock:
+                peers = list(self.peers.items())
+            for connection, state in peers:
+                if self.timeout and now - state.last_seen > self.timeout:
+                    REAPED.inc()
+                    self.forget(connection)
+                    # Le thread (ou la tâche) de lecture voit la fin de flux et libère la place
+                    connection.close(abort=True)
+                    continue
+                state.ping_id = self.ping_id
+                state.ping_sent = now
+                connection.send_frame(frame, CONTROL)
+        finally:
+            self.schedule()
@@ -0,0 +1,124 @@
+import secrets
+from typing import Callable, Dict, List, Set
+
+ANY_GAME = "*"             # game_id d'un joueur prêt à rejoindre n'importe quelle partie
+MATCH_ROOM_SIZE = 8        # Joueurs par room du matchmaking : la partie démarre dès qu'elle est pleine
+MATCH_START_DELAY = 5.0    # Une fois min_players atteint, délai laissé à la room pour se remplir (s)
+ROOM_POOL_SIZE = 32        # Rooms vides gardées pour de nouvelles parties
+
+
+def queue_key(size, mode) -> str:
+    """File d'attente du matchmaking : les joueurs ne sont réunis qu'à taille de carte et mode égaux"""
+    return f"{ANY_GAME}{mode}:{size}"
+
+
+class Matchmaker:
+    """Répartit les joueurs qui demandent "n'importe quelle partie".
+
+    Chaque file a au plus une room en remplissage : les joueurs y reçoivent une
+    place jusqu'à room_size, puis une nouvelle room est ouverte. Une room qui
+    démarre est scellée (plus aucune place attribuée). Toutes les méthodes sont
+    appelées sous le verrou des rooms du serveur.
+    """
+
+    def __init__(self, room_size: int = MATCH_ROOM_SIZE, owns: Callable[[str], bool] = None):
+        self.room_size = room_size
+        # Filtre des identifiants générés (un worker du mode --workers ne garde que les siens)
+        self.owns = owns
+        self.filling: Dict[str, str] = {}  # file -> game_id de la room en remplissage
+        self.queues: Dict[str, str] = {}   # game_id -> file
+        self.seats: Dict[str, int] = {}    # game_id -> places attribuées
+        self.starting: Set[str] = set()    # Rooms scellées en attendant leur démarrage
+
+    def assign(self, queue: str, taken) -> str:
+        """Attribue une place dans la room en remplissage de la file (créée si besoin)"""
+        game_id = self.filling.get(queue)
+        if game_id is None:
+            game_id = self.filling[queue] = self.new_game_id(taken)
+            self.queues[game_id] = queue
+            self.seats[game_id] = 0
+        self.seats[game_id] += 1
+        if self.seats[game_id] >= self.room_size:
+            del self.filling[queue]  # Pleine : les suivants vont dans une nouvelle room
+        return game_id
+
+    def new_game_id(self, taken) -> str:
+        while True:
+            game_id = f"partie-{secrets.token_hex(4)}"
+            if game_id not in taken and (self.owns is None or self.owns(game_id)):
+                return game_id
+
+    def release(self, game_id: str) -> None:
+        """Un joueur a quitté une room pas encore démarrée : sa place est de nouveau attribuable"""
+        if game_id not in self.seats:
+            return
+        self.seats[game_id] -= 1
+        if game_id not in self.starting:
+            self.reopen(game_id)
+
+    def seal(self, game_id: str) -> None:
+        """La room va démarrer : plus aucune place n'y est attribuée"""
+        if game_id not in self.seats:
+            return
+        self.starting.add(game_id)
+        queue = self.queues[game_id]
+        if self.filling.get(queue) == game_id:
+            del self.filling[queue]
+
+    def unseal(self, game_id: str) -> None:
+        """Le démarrage a échoué (départs entre-temps) : la room se remplit à nouveau"""
+        self.starting.discard(game_id)
+        self.reopen(game_id)
+
+    def reopen(self, game_id: str) -> None:
+        if game_id in self.seats and self.seats[game_id] < self.room_size:
+            self.filling.setdefault(self.queues[game_id], game_id)
+
+    def close(self, game_id: str) -> None:
+        """Oublie une room démarrée ou supprimée"""
+        queue = self.queues.pop(game_id, None)
+        if queue is None:
+            return
+        self.seats.pop(game_id, None)
+        self.starting.discard(game_id)
+        if self.filling.get(queue) == game_id:
+            del self.filling[queue]
+
+
+class RoomPool:
+    """Rooms vidées, gardées pour de nouvelles parties.
+
+    Une room reprise garde son acteur (thread ou tâche asyncio) et, à taille de
+    carte égale, sa grille et ses tableaux de cases libres : une vague
+    d'arrivées ne crée ni threads ni grilles. Appelé sous le verrou des rooms.
+    """
+
+    def __init__(self, factory: Callable, max_size: int = ROOM_POOL_SIZE):
+        self.factory = factory  # (game_id, size, mode, event_log) -> GameRoom neuve
+        self.max_size = max_size
+        self.rooms: Dict[int, List] = {}  # taille de carte -> rooms libres
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def acquire(self, game_id: str, size: int, mode: str, event_log=None):
+        """Renvoie une room pour une nouvelle partie, reprise du pool si possible"""
+        rooms = self.rooms.get(size) or next((rooms for rooms in self.rooms.values() if rooms), None)
+        if not rooms:
+            return self.factory(game_id, size, mode, event_log)
+        room = rooms.pop()
+        self.count -= 1
+        room.game_id = game_id
+        room.actor.name = f"room-{game_id}"
+        # La remise à zéro passe par l'acteur, avant toute commande de la nouvelle partie
+        room.submit(room.reset, game_id, size, mode, event_log)
+        return room
+
+    def release(self, room) -> bool:
+        """Garde une room vidée et fermée ; renvoie False si le pool est plein"""
+        if self.count >= self.max_size:
+            return False
+        self.rooms.setdefault(room.game_logic.size, []).append(room)
+        self.count += 1
+        return True
@@ -2,7 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import socket
 import threading
-import json
+from protocol import iter_messages, send_message
 
 class LoupGarouClient:
     def __init__(self):
@@ -56,7 +56,7 @@ class LoupGarouClient:
                 "name": self.player_name.get(),
                 "game_id": self.game_id.get()
             }
-            self.socket.send(json.dumps(player_info).encode())
+            send_message(self.socket, player_info)
             
             # Démarrer le thread d'écoute
             self.connected = True
@@ -78,23 +78,19 @@ class LoupGarouClient:
                 "game_id": self.game_id.get(),
                 "player": self.player_name.get()
             }
-            self.socket.send(json.dumps(message).encode())
+            send_message(self.socket, message)
             self.message_var.set("")  # Vider le champ de message
             
         except Exception as e:
             self.add_message(f"Erreur d'envoi: {str(e)}")
             
     def receive_messages(self):
-        while self.connected:
-            try:
-                data = self.socket.recv(1024).decode()
-                if data:
-                    message = json.loads(data)
-                    self.handle_message(message)
-            except Exception as e:
-                print(f"Erreur de réception: {str(e)}")
-                self.connected = False
-                break
+        try:
+            for message in iter_messages(self.socket):
+                self.handle_message(message)
+        except Exception as e:
+            print(f"Erreur de réception: {str(e)}")
+        self.connected = False
                 
     def handle_message(self, message):
         """Gère les différents types de messages reçus du serveur"""
@@ -102,8 +98,14 @@ class LoupGarouClient:
             self.update_game_status(message)
         elif message.get("type") == "chat":
             self.add_message(f"{message.get('player')}: {message.get('content')}")
+        elif message.get("type") == "chat_batch":
+            for entry in message.get("messages", []):
+                self.add_message(f"{entry.get('player')}: {entry.get('content')}")
         elif message.get("type") == "role_assignment":
             self.handle_role_assignment(message)
+        elif message.get("type") == "ping":
+            # Sans réponse, le serveur finirait par fermer la connexion
+            send_message(self.socket, {"type": "pong", "id": message.get("id")})
             
     def add_message(self, message):
         """Ajoute un message à la zone de chat"""
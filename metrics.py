@@ -0,0 +1,201 @@
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Bornes par défaut des histogrammes de durée (s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Étiquettes au format texte Prometheus : {nom="valeur",...}"""
+    items = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        items.append(f'{name}="{value}"')
+    if extra:
+        items.append(extra)
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+class Counter:
+    """Compteur monotone, éventuellement découpé par étiquettes"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, labels: tuple = ()) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[Tuple[str, tuple, float]]:
+        with self.lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            yield self.name, labels, value
+
+    def render(self) -> List[str]:
+        return [f"{name}{format_labels(self.labelnames, labels)} {value}" for name, labels, value in self.samples()]
+
+    def to_json(self) -> list:
+        return [{"labels": dict(zip(self.labelnames, labels)), "value": value}
+                for _, labels, value in self.samples()]
+
+
+class Gauge(Counter):
+    """Valeur instantanée, fixée directement ou calculée au moment de la lecture.
+
+    callback() renvoie soit un nombre, soit un dictionnaire étiquettes -> valeur.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), callback: Callable = None):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, labels: tuple = ()) -> None:
+        with self.lock:
+            self.values[labels] = value
+
+    def samples(self) -> Iterator[Tuple[str, tuple, float]]:
+        if self.callback is None:
+            yield from super().samples()
+            return
+        result = self.callback()
+        if isinstance(result, dict):
+            for labels, value in result.items():
+                yield self.name, labels if isinstance(labels, tuple) else (labels,), value
+        else:
+            yield self.name, (), result
+
+
+class Histogram:
+    """Répartition d'observations (durées...) dans des intervalles fixes"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # étiquettes -> [compte par intervalle (dernier = au-delà de la plus grande borne), somme]
+        self.values: Dict[tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self) -> List[Tuple[tuple, List[int], float]]:
+        with self.lock:
+            return [(labels, list(counts), total) for labels, (counts, total) in self.values.items()]
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, counts, total in self.snapshot():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, le)} {cumulative}")
+            suffix = format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+    def to_json(self) -> list:
+        return [{"labels": dict(zip(self.labelnames, labels)), "count": sum(counts), "sum": total,
+                 "buckets": dict(zip([repr(b) for b in self.buckets] + ["+Inf"], counts))}
+                for labels, counts, total in self.snapshot()]
+
+
+class MetricsRegistry:
+    """Ensemble des métriques d'un processus, exportables en texte Prometheus ou en JSON"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        # Un nom déjà pris est remplacé (ex: plusieurs GameServer successifs dans un même processus)
+        with self.lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (), callback: Callable = None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, callback))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render_prometheus(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> dict:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: {"type": metric.kind, "help": metric.help, "values": metric.to_json()}
+                for metric in metrics}
+
+
+# Registre partagé par tout le processus (chaque worker du mode --workers a le sien)
+REGISTRY = MetricsRegistry()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = self.registry.render_prometheus().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(self.registry.to_json()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Pas de ligne de log à chaque collecte
+
+
+def start_metrics_server(host: str, port: int, registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """Expose /metrics (texte Prometheus) et /metrics.json dans un thread dédié"""
+    handler = type("BoundMetricsHandler", (MetricsHandler,), {"registry": registry})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Métriques exposées sur http://{host}:{port}/metrics")
+    return httpd
@@ -0,0 +1,139 @@
+import struct
+from typing import Dict, Iterator, List
+from codec import JSON_CODEC, Codec, CodecError, decode_payload
+
+# Chaque trame = longueur sur 4 octets (big-endian) suivie du contenu encodé par le codec
+# (JSON en UTF-8 par défaut, voir codec.py)
+HEADER = struct.Struct('!I')
+HEADER_SIZE = HEADER.size
+MAX_FRAME_SIZE = 1024 * 1024  # 1 Mo, largement suffisant pour une grille complète
+RECV_SIZE = 65536
+# Un client qui a demandé un resync n'en redemande pas avant ce délai (l'instantané peut avoir été abandonné)
+RESYNC_RETRY = 2.0
+
+
+class ProtocolError(Exception):
+    """Erreur de format sur le flux (trame trop grande, JSON invalide...)"""
+
+
+class FrameDecoder:
+    """Décodeur de trames en flux continu.
+
+    Les données reçues sont accumulées dans un buffer borné ; on avance un
+    curseur sur les trames complètes et on ne compacte le buffer qu'une fois
+    par appel à feed(), ce qui évite de re-parcourir le buffer pour chaque trame.
+    """
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Ajoute des données reçues et renvoie les trames complètes"""
+        self.buffer += data
+        frames = []
+        offset = 0
+        end = len(self.buffer)
+
+        while end - offset >= HEADER_SIZE:
+            (length,) = HEADER.unpack_from(self.buffer, offset)
+            if length > self.max_frame_size:
+                raise ProtocolError(f"Trame trop grande: {length} octets")
+            start = offset + HEADER_SIZE
+            if end - start < length:
+                break  # Trame partielle, on attend la suite
+            frames.append(bytes(self.buffer[start:start + length]))
+            offset = start + length
+
+        # Retire en une seule fois les trames consommées
+        if offset:
+            del self.buffer[:offset]
+        return frames
+
+    def feed_messages(self, data: bytes) -> List[dict]:
+        """Comme feed(), mais renvoie directement les messages décodés"""
+        return [decode_message(frame) for frame in self.feed(data)]
+
+
+def encode_frame(payload: bytes) -> bytes:
+    """Préfixe un contenu avec sa longueur"""
+    return HEADER.pack(len(payload)) + payload
+
+
+def encode_message(message: dict, codec: Codec = JSON_CODEC) -> bytes:
+    """Sérialise un message en une trame prête à être envoyée"""
+    return encode_frame(codec.encode(message))
+
+
+class SharedEncoder:
+    """Encode un lot de messages proches en ne sérialisant qu'une fois les parties communes.
+
+    Chaque valeur partagée est identifiée par une clé : sa forme encodée est mise
+    en cache et recopiée telle quelle dans chaque trame qui l'utilise.
+    """
+
+    def __init__(self, codec: Codec = JSON_CODEC):
+        self.codec = codec
+        self.fragments: Dict[object, bytes] = {}
+
+    def shared(self, key, field: str, value) -> bytes:
+        """Renvoie la valeur d'un champ partagé, sérialisée au premier appel seulement"""
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            fragment = self.fragments[key] = self.codec.encode_field(field, value)
+        return fragment
+
+    def encode(self, fields: dict, shared: Dict[str, bytes] = None) -> bytes:
+        """Construit une trame à partir de champs propres au message et de fragments partagés"""
+        return encode_frame(self.codec.encode_parts(fields, shared or {}))
+
+
+def decode_message(payload: bytes) -> dict:
+    """Décode le contenu d'une trame (le codec est reconnu automatiquement)"""
+    try:
+        return decode_payload(payload)
+    except (ValueError, CodecError, struct.error) as e:
+        raise ProtocolError(f"Message invalide: {str(e)}")
+
+
+def diff_views(old: bytes, new: bytes, width: int) -> List[list]:
+    """Liste des [index, caractère] qui diffèrent entre deux vues de même taille.
+
+    Les lignes identiques sont écartées par une comparaison de tranches (en C),
+    seules les lignes modifiées sont parcourues case par case.
+    """
+    changes = []
+    for start in range(0, len(new), width):
+        end = start + width
+        if old[start:end] != new[start:end]:
+            for i in range(start, end):
+                if old[i] != new[i]:
+                    changes.append([i, chr(new[i])])
+    return changes
+
+
+def apply_changes(board: list, changes: List[list]) -> None:
+    """Applique une liste de changements [index, caractère] sur une grille en cache"""
+    for index, value in changes:
+        board[index] = value
+
+
+def send_message(sock, message: dict, codec: Codec = JSON_CODEC) -> None:
+    """Envoie un message complet sur la socket"""
+    sock.sendall(encode_message(message, codec))
+
+
+def iter_messages(sock, decoder: FrameDecoder = None, initial: bytes = b"") -> Iterator[dict]:
+    """Lit les messages d'une socket jusqu'à la fermeture de la connexion.
+
+    initial contient d'éventuelles données déjà lues sur la socket (ex: par l'acceptor).
+    """
+    decoder = decoder or FrameDecoder()
+    for message in decoder.feed_messages(initial):
+        yield message
+    while True:
+        data = sock.recv(RECV_SIZE)
+        if not data:
+            return
+        for message in decoder.feed_messages(data):
+            yield message
@@ -0,0 +1,97 @@
+import argparse
+import json
+import random
+import sys
+import time
+from typing import List
+from event_log import EVENT_LOG_VERSION, read_events
+from game_logic import GameLogic, draw_roles
+
+
+class ReplayError(Exception):
+    """Journal illisible ou incompatible"""
+
+
+def replay(events: List[list], compute_views: bool = False) -> dict:
+    """Rejoue les événements d'une room sur un GameLogic neuf, aussi vite que possible.
+
+    La graine enregistrée à la création redonne les mêmes rôles et placements ;
+    chaque coup et chaque mort journalisés sont vérifiés au passage. Avec
+    compute_views, les vues de tous les joueurs sont recalculées après chaque
+    changement, comme le fait broadcast_game_state.
+    """
+    logic = None
+    rng = None
+    report = {"events": 0, "moves": 0, "ticks": 0, "deaths": 0, "divergences": []}
+    started = time.perf_counter()
+
+    for event in events:
+        report["events"] += 1
+        elapsed, kind, *args = event
+        if kind == "log":
+            if args[0] != EVENT_LOG_VERSION:
+                raise ReplayError(f"Version de journal non supportée: {args[0]}")
+        elif kind == "create":
+            game_id, size, mode, seed = args
+            report.update(game_id=game_id, size=size, mode=mode)
+            rng = random.Random(seed)
+            logic = GameLogic(size, rng)
+        elif logic is None:
+            raise ReplayError("Journal sans événement create")
+        elif kind == "start":
+            names = args[0]
+            roles = draw_roles(names, rng)
+            for name in names:
+                logic.add_player(name, roles[name])
+            report["players"] = len(names)
+        elif kind == "move":
+            name, direction = args
+            report["moves"] += 1
+            if not logic.move_player(name, direction):
+                report["divergences"].append(f"{elapsed} ms : coup refusé pour {name}")
+        elif kind == "tick":
+            report["ticks"] += 1
+            report["moves"] += len(args[0])
+            logic.resolve_tick(args[0])
+        elif kind == "death":
+            report["deaths"] += 1
+            player = logic.players.get(args[0])
+            if player is None or player["status"] != "dead":
+                report["divergences"].append(f"{elapsed} ms : {args[0]} devrait être mort")
+        # join, leave, skip, restore : sans effet sur GameLogic
+
+        if compute_views and kind in ("start", "move", "tick"):
+            logic.get_views(list(logic.players))
+
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rejoue des journaux de rooms (serveur lancé avec --event-log)")
+    parser.add_argument("logs", nargs="+", help="Fichiers .events à rejouer")
+    parser.add_argument("--views", action="store_true", help="Recalcule les vues après chaque coup (charge réaliste)")
+    parser.add_argument("--repeat", type=int, default=1, help="Nombre de rejeux de chaque journal")
+    parser.add_argument("--json", action="store_true", help="Affiche les rapports en JSON")
+    args = parser.parse_args(argv)
+
+    diverged = False
+    for path in args.logs:
+        events = list(read_events(path))
+        for _ in range(args.repeat):
+            report = replay(events, args.views)
+        report["log"] = path
+        diverged = diverged or bool(report["divergences"])
+        if args.json:
+            print(json.dumps(report))
+            continue
+        rate = report["events"] / report["seconds"] if report["seconds"] else 0.0
+        print(f"{path}: {report['events']} événements, {report['moves']} coups, {report['deaths']} morts "
+              f"en {report['seconds'] * 1000:.2f} ms ({rate:.0f} événements/s)")
+        for divergence in report["divergences"]:
+            print(f"  DIVERGENCE {divergence}")
+    return 1 if diverged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
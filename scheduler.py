@@ -0,0 +1,165 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set
+
+TICK = 0.1        # Résolution de la roue (s)
+WHEEL_SLOTS = 512  # Nombre de cases : au-delà de TICK * WHEEL_SLOTS, un timer fait plusieurs tours
+
+
+class TurnRing:
+    """Anneau des joueurs vivants, dans l'ordre du tour de jeu.
+
+    Liste circulaire doublement chaînée indexée par clé : passer au joueur
+    suivant, ajouter ou retirer un joueur se fait en O(1), sans parcourir la room.
+    """
+
+    def __init__(self, keys: Iterable[Hashable] = ()):
+        self.next: Dict[Hashable, Hashable] = {}
+        self.prev: Dict[Hashable, Hashable] = {}
+        self.current: Optional[Hashable] = None
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return len(self.next)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.next
+
+    def add(self, key: Hashable) -> None:
+        """Ajoute un joueur en fin de tour (juste avant le joueur courant)"""
+        if key in self.next:
+            return
+        if self.current is None:
+            self.next[key] = self.prev[key] = key
+            self.current = key
+            return
+        last = self.prev[self.current]
+        self.next[last] = key
+        self.prev[key] = last
+        self.next[key] = self.current
+        self.prev[self.current] = key
+
+    def remove(self, key: Hashable) -> bool:
+        """Retire un joueur ; renvoie True si c'était son tour (le suivant devient courant)"""
+        if key not in self.next:
+            return False
+        following = self.next.pop(key)
+        previous = self.prev.pop(key)
+        if following == key:
+            self.current = None
+            return True
+        self.next[previous] = following
+        self.prev[following] = previous
+        if self.current == key:
+            self.current = following
+            return True
+        return False
+
+    def replace(self, old: Hashable, new: Hashable) -> None:
+        """Remplace une clé par une autre à la même place (joueur reconnecté)"""
+        if old not in self.next or old == new:
+            return
+        following = self.next.pop(old)
+        previous = self.prev.pop(old)
+        if following == old:
+            self.next[new] = self.prev[new] = new
+        else:
+            self.next[new] = following
+            self.prev[new] = previous
+            self.next[previous] = new
+            self.prev[following] = new
+        if self.current == old:
+            self.current = new
+
+    def __iter__(self) -> Iterator[Hashable]:
+        """Parcourt l'anneau dans l'ordre de jeu, à partir du joueur courant"""
+        key = self.current
+        for _ in range(len(self.next)):
+            yield key
+            key = self.next[key]
+
+    def advance(self) -> Optional[Hashable]:
+        """Passe au joueur suivant et le renvoie (None si l'anneau est vide)"""
+        if self.current is not None:
+            self.current = self.next[self.current]
+        return self.current
+
+
+class Timer:
+    """Échéance planifiée dans une TimerWheel"""
+
+    __slots__ = ("expires", "callback", "args", "slot")
+
+    def __init__(self, expires: int, callback: Callable, args: tuple):
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.slot: Optional[Set["Timer"]] = None
+
+
+class TimerWheel:
+    """Roue de timers partagée par toutes les rooms d'un serveur.
+
+    Un seul thread avance la roue d'une case tous les TICK secondes et déclenche
+    les timers arrivés à échéance. Planifier ou annuler un timer est en O(1),
+    quel que soit le nombre de rooms. Les callbacks doivent être courts : en
+    pratique ils se contentent de soumettre une commande à l'acteur d'une room.
+    """
+
+    def __init__(self, tick: float = TICK, slots: int = WHEEL_SLOTS):
+        self.tick = tick
+        self.slots: List[Set[Timer]] = [set() for _ in range(slots)]
+        self.current_tick = 0
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """Appelle callback(*args) dans environ delay secondes (à TICK près)"""
+        ticks = max(1, math.ceil(delay / self.tick))
+        with self.lock:
+            timer = Timer(self.current_tick + ticks, callback, args)
+            timer.slot = self.slots[timer.expires % len(self.slots)]
+            timer.slot.add(timer)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="timer-wheel", daemon=True)
+                self.thread.start()
+        return timer
+
+    def cancel(self, timer: Optional[Timer]) -> None:
+        """Annule un timer (sans effet s'il a déjà été déclenché)"""
+        if timer is None:
+            return
+        with self.lock:
+            if timer.slot is not None:
+                timer.slot.discard(timer)
+                timer.slot = None
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def advance(self) -> List[Timer]:
+        """Avance d'une case et renvoie les timers échus"""
+        with self.lock:
+            self.current_tick += 1
+            slot = self.slots[self.current_tick % len(self.slots)]
+            due = [timer for timer in slot if timer.expires <= self.current_tick]
+            for timer in due:
+                slot.discard(timer)
+                timer.slot = None
+        return due
+
+    def run(self) -> None:
+        started = time.monotonic()
+        while not self.stopped.is_set():
+            # Cadence calée sur l'horloge de départ pour ne pas dériver
+            delay = started + (self.current_tick + 1) * self.tick - time.monotonic()
+            if delay > 0 and self.stopped.wait(delay):
+                return
+            for timer in self.advance():
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    print(f"Erreur dans un timer: {str(e)}")
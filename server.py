@@ -1,27 +1,148 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
 import socket
 import threading
-import json
 import random
-from typing import Dict, List
-from game_logic import GameLogic
+import time
+from typing import Callable, Deque, Dict, List
+from actor import AsyncRoomActor, RoomActor
+from chat import CHAT_BATCH_WINDOW, CHAT_HISTORY_SIZE, MAX_CHAT_LENGTH, TokenBucket, chat_message
+from codec import JSON_CODEC, Codec, negotiate_codec
+from connection import (CHAT, CONTROL, MAX_QUEUE_BYTES, OVERFLOW_POLICIES, STATE, SocketConnection,
+                        StreamConnection)
+from event_log import EventLog, open_room_log, resume_room_log
+from game_logic import DEFAULT_SIZE, GameLogic, draw_roles, is_valid_size
+from heartbeat import HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT, Heartbeats
+from lobby import ANY_GAME, MATCH_ROOM_SIZE, MATCH_START_DELAY, Matchmaker, RoomPool, queue_key
+from metrics import REGISTRY, start_metrics_server
+from protocol import RECV_SIZE, FrameDecoder, SharedEncoder, diff_views, encode_message, send_message
+from scheduler import TimerWheel, TurnRing
+from sessions import RECONNECT_GRACE, OfflineSeat, new_token
+from snapshot import (RESTORE_GRACE, SNAPSHOT_INTERVAL, SNAPSHOT_TIMEOUT, SnapshotError, read_snapshot,
+                      write_snapshot)
+
+ENGINES = ("threading", "asyncio")
+LISTEN_BACKLOG = 1024
+TURN_TIMEOUT = 30.0  # Temps accordé pour jouer avant que le tour ne passe automatiquement (s)
+# "turns" : chacun son tour ; "tick" : coups simultanés résolus à intervalle fixe
+MODES = ("turns", "tick")
+TICK_INTERVAL = 0.2
+RESYNC_INTERVAL = 1.0  # Au plus un instantané demandé (resync) par client et par seconde
+CLIENT_MESSAGE_TYPES = ("connection", "start_game", "message", "move", "disconnect", "resync", "pong")
+
+# Métriques du processus (exposées par --metrics-port)
+MESSAGES_RECEIVED = REGISTRY.counter("loupgarou_messages_received_total", "Messages reçus par type", ("type",))
+BYTES_RECEIVED = REGISTRY.counter("loupgarou_bytes_received_total", "Octets reçus des clients")
+CONNECTIONS = REGISTRY.counter("loupgarou_connections_total", "Connexions acceptées")
+CONNECTION_ERRORS = REGISTRY.counter("loupgarou_connection_errors_total", "Connexions terminées sur une erreur")
+RECONNECTS = REGISTRY.counter("loupgarou_reconnects_total", "Joueurs revenus à leur place avec leur jeton de session")
+BROADCAST_SECONDS = REGISTRY.histogram("loupgarou_broadcast_game_state_seconds",
+                                       "Durée de GameRoom.broadcast_game_state")
+VIEWS_SECONDS = REGISTRY.histogram("loupgarou_views_seconds",
+                                   "Calcul des vues de tous les joueurs d'une room (get_views)")
 
 class GameRoom:
-    def __init__(self, game_id: str):
+    def __init__(self, game_id: str, actor_factory: Callable = RoomActor, size: int = DEFAULT_SIZE,
+                 timers: TimerWheel = None, turn_timeout: float = TURN_TIMEOUT, mode: str = "turns",
+                 tick_interval: float = TICK_INTERVAL, event_log: EventLog = None):
+        # Toutes les commandes sur la room sont sérialisées par cet acteur
+        self.actor = actor_factory(f"room-{game_id}")
+        # Échéances (tour, tick, chat, démarrage), dans la roue partagée par le serveur (aucune si timers est None)
+        self.timers = timers
+        self.turn_timeout = turn_timeout
+        self.tick_interval = tick_interval
+        self.turn_timer = None
+        self.tick_timer = None
+        self.chat_timer = None
+        self.start_timer = None  # Démarrage automatique d'une room du matchmaking
+        self.game_logic = None
+        # Incrémenté à chaque changement d'état : le snapshot d'une room inchangée est réutilisé
+        self.version = 0
+        self.reset(game_id, size, mode, event_log)
+
+    def reset(self, game_id: str, size: int = DEFAULT_SIZE, mode: str = "turns", event_log: EventLog = None) -> None:
+        """Remet la room dans l'état d'une partie neuve.
+
+        Appelé à la création, puis par l'acteur de la room quand elle est reprise
+        dans le pool (RoomPool) : l'acteur et la grille sont réutilisés.
+        """
+        if self.timers is not None:
+            for timer in (self.turn_timer, self.tick_timer, self.chat_timer, self.start_timer):
+                self.timers.cancel(timer)
+        self.turn_timer = self.tick_timer = self.chat_timer = self.start_timer = None
         self.game_id = game_id
         self.players: Dict[socket.socket, dict] = {}  # socket -> {name: str, role: None}
-        self.messages: List[dict] = []
+        # Jeton de session -> socket actuelle du joueur (ou OfflineSeat en son absence)
+        self.tokens: Dict[str, socket.socket] = {}
+        # Derniers messages de chat (ring buffer), envoyés aux joueurs qui arrivent
+        self.messages: Deque[dict] = collections.deque(maxlen=CHAT_HISTORY_SIZE)
+        self.chat_count = 0  # Messages ajoutés à l'historique depuis le début de la partie
+        # Messages de joueurs en attente de diffusion groupée
+        self.pending_chat: List[dict] = []
         self.started = False
-        self.game_logic = GameLogic()
+        # Tout l'aléa de la partie (rôles, placements) vient de ce générateur : la graine
+        # enregistrée dans le journal suffit à rejouer la partie
+        self.seed = random.getrandbits(64)
+        self.rng = random.Random(self.seed)
+        if self.game_logic is not None and self.game_logic.size == size:
+            self.game_logic.reset(self.rng)
+        else:
+            self.game_logic = GameLogic(size, self.rng)
+        self.event_log = event_log
+        self.log_event("create", game_id, size, mode, self.seed)
         self.current_turn = None
+        # Joueurs vivants dans l'ordre de jeu ; current_turn suit turns.current
+        self.turns = TurnRing()
+        self.turn_number = 0
+        self.skipped_turns = 0  # Tours passés d'affilée faute de coup
+        # Mode temps réel : dernier coup demandé par chaque joueur depuis le tick précédent
+        self.mode = mode
+        self.pending_moves: Dict[str, int] = {}
         self.min_players = 4  # Minimum requis pour démarrer
         self.announced_deaths = set()  # Nouvelle liste pour tracker les morts annoncées
+        # Dernier état envoyé à chaque joueur : socket -> {seq, view, is_your_turn, player_status, current_player}
+        self.sync_state: Dict[socket.socket, dict] = {}
+        self.resync_times: Dict[socket.socket, float] = {}  # Dernière demande de resync servie
+        # Spectateurs : ni place ni rôle, ils reçoivent le chat, la liste des joueurs et le flux complet
+        self.spectators: Dict[socket.socket, Codec] = {}
+        # Destinataires du flux complet (spectateurs et joueurs morts) -> codec
+        self.viewers: Dict[socket.socket, Codec] = {}
+        # Dernier état du flux complet {seq, view, current_player}, commun à tous ses destinataires
+        self.stream = None
+
+    def submit(self, func: Callable, *args) -> None:
+        """Planifie une commande dans la file de la room"""
+        self.actor.submit(func, *args)
+
+    def log_event(self, event: str, *args) -> None:
+        """Ajoute un événement au journal de la room, s'il y en a un"""
+        self.version += 1
+        if self.event_log is not None:
+            self.event_log.record(event, *args)
 
-    def add_player(self, client_socket: socket.socket, player_name: str) -> None:
+    def close(self) -> None:
+        """Libère les ressources de la room une fois vide"""
+        if self.event_log is not None:
+            self.event_log.close()
+
+    def add_player(self, client_socket: socket.socket, player_name: str, codec: Codec = JSON_CODEC) -> None:
         """Ajoute un joueur sans rôle"""
+        self.flush_chat()  # L'historique envoyé au nouveau venu ne doit pas recouvrir le prochain chat_batch
+        token = new_token()
         self.players[client_socket] = {
             "name": player_name,
-            "role": None
+            "role": None,
+            "codec": codec,  # Codec négocié à la connexion
+            "chat_bucket": TokenBucket(),
+            "token": token  # Permet de reprendre cette place après une reconnexion
         }
+        self.tokens[token] = client_socket
+        self.log_event("join", player_name)
+        self.send_message_to_player(client_socket, {"type": "session", "token": token})
+        if self.messages:
+            self.send_message_to_player(client_socket, {"type": "chat_batch", "messages": list(self.messages)})
         self.broadcast_player_list()
         
         # Vérifie si on peut démarrer
@@ -30,16 +151,11 @@ class GameRoom:
 
     def assign_roles(self) -> None:
         """Attribue les rôles aléatoirement"""
-        player_sockets = list(self.players.keys())
-        nb_players = len(player_sockets)
-        nb_wolves = max(1, nb_players // 4)  # 1 loup pour 4 joueurs
+        roles = draw_roles([player["name"] for player in self.players.values()], self.rng)
 
-        # Mélange la liste et assigne les rôles
-        random.shuffle(player_sockets)
-        
-        for i, socket in enumerate(player_sockets):
-            role = "loup" if i < nb_wolves else "villageois"
-            self.players[socket]["role"] = role
+        for socket, player in self.players.items():
+            role = roles[player["name"]]
+            player["role"] = role
             
             # Envoie le rôle au joueur
             role_message = {
@@ -52,32 +168,160 @@ class GameRoom:
         """Retire un joueur de la partie"""
         if client_socket in self.players:
             player_name = self.players[client_socket]["name"]  # Accès correct au nom du joueur
-            del self.players[client_socket]
+            self.tokens.pop(self.players.pop(client_socket)["token"], None)
+            self.log_event("leave", player_name)
+            self.sync_state.pop(client_socket, None)
+            self.resync_times.pop(client_socket, None)
+            self.viewers.pop(client_socket, None)
+            self.pending_moves.pop(player_name, None)
+            if not self.players and self.timers is not None:
+                self.timers.cancel(self.tick_timer)
+                self.timers.cancel(self.chat_timer)
             self.broadcast_system_message(f"{player_name} a quitté la partie.")
             self.broadcast_player_list()
             
-            # Si la partie est en cours, on vérifie s'il faut mettre à jour le tour
-            if self.started and client_socket == self.current_turn:
-                if self.players:  # S'il reste des joueurs
-                    self.current_turn = list(self.players.keys())[0]
+            # Si c'était son tour, il passe au joueur vivant suivant
+            if self.turns.remove(client_socket):
+                self.start_turn(self.turns.current)
+                if self.players:
                     self.broadcast_game_state()
 
+    def move_seat(self, old, new) -> dict:
+        """Remplace la clé d'un joueur (socket ou OfflineSeat) partout où elle sert, en O(1)"""
+        player = self.players.pop(old)
+        self.players[new] = player
+        self.tokens[player["token"]] = new
+        self.sync_state.pop(old, None)
+        self.resync_times.pop(old, None)
+        if old in self.viewers:
+            self.viewers[new] = self.viewers.pop(old)
+        self.turns.replace(old, new)
+        if self.current_turn is old:
+            self.current_turn = new
+        return player
+
+    def detach_player(self, client_socket: socket.socket) -> OfflineSeat:
+        """Garde la place d'un joueur dont la connexion est tombée : son rôle, sa position
+        et son rang dans les tours l'attendent sous une OfflineSeat"""
+        seat = OfflineSeat(self.players[client_socket]["token"], self.chat_count)
+        player = self.move_seat(client_socket, seat)
+        self.broadcast_system_message(f"{player['name']} a perdu la connexion.")
+        return seat
+
+    def rebind_player(self, token: str, client_socket: socket.socket, codec: Codec = JSON_CODEC) -> bool:
+        """Rend sa place (rôle, position, tour) au joueur qui présente son jeton de session.
+
+        L'ancienne socket (ou l'OfflineSeat qui l'a remplacée) est remplacée
+        partout où elle sert de clé. Le joueur reçoit seulement son rôle, les
+        messages manqués et un état complet. Renvoie False si le jeton est inconnu.
+        """
+        seat = self.tokens.get(token)
+        if seat is None:
+            return False
+        self.flush_chat()
+        player = self.move_seat(seat, client_socket)
+        player["codec"] = codec
+        if client_socket in self.viewers:
+            self.viewers[client_socket] = codec
+        seat.close()  # Une ancienne connexion encore ouverte est remplacée par la nouvelle
+
+        self.send_message_to_player(client_socket, {"type": "session", "token": token})
+        if player["role"]:
+            self.send_message_to_player(client_socket, {"type": "role_assignment", "role": player["role"]})
+        missed = list(self.messages)
+        if isinstance(seat, OfflineSeat) and seat.chat_seen is not None:
+            missed = missed[len(missed) - min(len(missed), self.chat_count - seat.chat_seen):]
+        if missed:
+            self.send_message_to_player(client_socket, {"type": "chat_batch", "messages": missed})
+        self.broadcast_player_list()
+        self.resync_player(client_socket)
+        return True
+
+    def add_spectator(self, client_socket: socket.socket, codec: Codec = JSON_CODEC) -> None:
+        """Ajoute un spectateur : il suit le chat et la grille complète, sans jouer"""
+        self.flush_chat()
+        self.spectators[client_socket] = codec
+        if self.messages:
+            self.send_message_to_player(client_socket, {"type": "chat_batch", "messages": list(self.messages)})
+        self.send_message_to_player(client_socket, {
+            "type": "player_list",
+            "players": [player["name"] for player in self.players.values()]
+        })
+        self.watch(client_socket, codec)
+
+    def remove_spectator(self, client_socket: socket.socket) -> None:
+        self.spectators.pop(client_socket, None)
+        self.viewers.pop(client_socket, None)
+        self.resync_times.pop(client_socket, None)
+
     def broadcast_message(self, message: dict) -> None:
-        """Envoie un message à tous les joueurs de la room"""
-        for client_socket in self.players.keys():
-            try:
-                client_socket.send(json.dumps(message).encode())
-            except Exception as e:
-                print(f"Erreur d'envoi: {str(e)}")
+        """Envoie un message à tous les joueurs et spectateurs de la room (sérialisé une seule fois par codec)"""
+        frames = {}
+        kind = CHAT if message.get("type") in ("chat", "chat_batch") else CONTROL
+        for client_socket, player in self.players.items():
+            codec = player["codec"]
+            data = frames.get(codec.name)
+            if data is None:
+                data = frames[codec.name] = encode_message(message, codec)
+            self.send_data_to_player(client_socket, data, kind)
+        for client_socket, codec in self.spectators.items():
+            data = frames.get(codec.name)
+            if data is None:
+                data = frames[codec.name] = encode_message(message, codec)
+            self.send_data_to_player(client_socket, data, kind)
 
     def broadcast_system_message(self, content: str) -> None:
         """Envoie un message système à tous les joueurs"""
-        message = {
-            "type": "chat",
+        # Les messages de joueurs en attente partent d'abord, pour garder l'ordre
+        self.flush_chat()
+        entry = {
             "player": "Système",
             "content": content
         }
-        self.broadcast_message(message)
+        self.messages.append(entry)
+        self.chat_count += 1
+        self.version += 1
+        self.broadcast_message(chat_message([entry]))
+
+    def post_chat(self, client_socket: socket.socket, content) -> None:
+        """Message de chat d'un joueur (exécuté par l'acteur de la room).
+
+        Le nom vient de la room, pas du client. Chaque joueur est limité par un
+        seau à jetons, et les messages reçus dans une même fenêtre sont diffusés
+        ensemble : une seule trame par destinataire.
+        """
+        player = self.players.get(client_socket)
+        if player is None or not isinstance(content, str) or not content:
+            return
+        bucket = player["chat_bucket"]
+        if not bucket.consume():
+            if not bucket.limited:
+                bucket.limited = True
+                self.send_message_to_player(client_socket, {
+                    "type": "error",
+                    "content": "Trop de messages, patientez un instant"
+                })
+            return
+        bucket.limited = False
+
+        entry = {"player": player["name"], "content": content[:MAX_CHAT_LENGTH]}
+        self.messages.append(entry)
+        self.chat_count += 1
+        self.version += 1
+        self.pending_chat.append(entry)
+        if self.timers is None:
+            self.flush_chat()
+        elif self.chat_timer is None:
+            self.chat_timer = self.timers.schedule(CHAT_BATCH_WINDOW, self.submit, self.flush_chat)
+
+    def flush_chat(self) -> None:
+        """Diffuse les messages de chat en attente en une seule trame"""
+        if self.chat_timer is not None:
+            self.timers.cancel(self.chat_timer)
+            self.chat_timer = None
+        if self.pending_chat:
+            entries, self.pending_chat = self.pending_chat, []
+            self.broadcast_message(chat_message(entries))
 
     def broadcast_player_list(self) -> None:
         """Envoie la liste mise à jour des joueurs à tous les participants"""
@@ -102,15 +346,29 @@ class GameRoom:
             })
             return False
 
+        # Chaque joueur doit trouver une case libre : vérifié avant de marquer la partie démarrée
+        if len(self.players) > len(self.game_logic.free_cells):
+            self.send_message_to_player(initiator_socket, {
+                "type": "error",
+                "content": f"Carte trop petite pour {len(self.players)} joueurs "
+                           f"({len(self.game_logic.free_cells)} cases libres)"
+            })
+            return False
+
         self.started = True
+        self.log_event("start", [player["name"] for player in self.players.values()])
         self.assign_roles()
         
         # Initialise les positions des joueurs
         for socket, player in self.players.items():
             self.game_logic.add_player(player["name"], player["role"])
 
-        # Définit le premier joueur
-        self.current_turn = list(self.players.keys())[0]
+        # Définit l'ordre de jeu et le premier joueur (en mode tick, tout le monde joue à chaque tick)
+        if self.mode == "tick":
+            self.schedule_tick()
+        else:
+            self.turns = TurnRing(self.players)
+            self.start_turn(self.turns.current)
         
         # Annonce le début de la partie
         self.broadcast_system_message("La partie commence !")
@@ -118,98 +376,608 @@ class GameRoom:
         return True
 
     def broadcast_game_state(self):
-        """Envoie l'état du jeu à chaque joueur"""
-        current_player_name = self.players[self.current_turn]["name"] if self.current_turn else "Personne"
-        
+        """Envoie l'état du jeu à chaque joueur.
+
+        Un joueur sans état connu reçoit un instantané complet (game_state), les
+        autres seulement les cases et champs modifiés (game_state_delta), numérotés
+        par un numéro de séquence propre à chaque joueur. Les parties communes
+        (joueur courant...) ne sont sérialisées qu'une fois. Les joueurs morts
+        rejoignent les spectateurs sur le flux complet (broadcast_stream).
+
+        La dernière vue envoyée sert de cache : seules sont recalculées celles des
+        joueurs dont le champ de vision contient une case modifiée depuis l'envoi
+        précédent. Les autres ne reçoivent que leurs champs modifiés (tour...).
+        """
+        started = time.perf_counter()
+        current_player_name = self.current_player_name()
+        living = {}
+        dead = []
         for socket, player in self.players.items():
+            if socket in self.viewers:
+                continue
+            if self.game_logic.players[player["name"]]['status'] == 'dead':
+                dead.append(socket)
+            else:
+                living[socket] = player
+        # Vues à recalculer : joueurs sans état connu ou qui voient une case modifiée
+        seeing = self.game_logic.players_seeing(self.game_logic.take_dirty())
+        views = self.game_logic.get_views([player["name"] for socket, player in living.items()
+                                           if player["name"] in seeing or socket not in self.sync_state])
+        VIEWS_SECONDS.observe(time.perf_counter() - started)
+        encoders = {}  # Un encodeur par codec, partagé par tous les joueurs qui l'utilisent
+        
+        for socket, player in living.items():
             player_name = player["name"]
-            player_status = self.game_logic.players[player_name]['status']
-            environment = self.game_logic.get_environment(player_name)
-            state_message = {
-                "type": "game_state",
-                "environment": environment,
-                "is_your_turn": socket == self.current_turn,
-                "player_status": player_status,
-                "current_player": current_player_name
-            }
-            self.send_message_to_player(socket, state_message)
+            encoder = encoders.get(player["codec"].name)
+            if encoder is None:
+                encoder = encoders[player["codec"].name] = SharedEncoder(player["codec"])
+            fields = self.player_fields(socket, player_name, current_player_name)
+            view = views.get(player_name)
+            state = self.sync_state.get(socket)
+
+            if state is None:
+                self.send_snapshot(socket, view, fields, encoder)
+                continue
+
+            changes = diff_views(state["view"], view, self.game_logic.size) if view is not None else []
+            delta = {key: value for key, value in fields.items() if state[key] != value}
+            if not changes and not delta:
+                continue
+
+            state["seq"] += 1
+            if view is not None:
+                state["view"] = view
+            state.update(delta)
+
+            own_fields = {"type": "game_state_delta", "seq": state["seq"]}
+            if changes:
+                own_fields["changes"] = changes
+                shared = {}
+            else:
+                shared = {"changes": encoder.shared("changes", "changes", changes)}
+            for key, value in delta.items():
+                if key == "current_player":
+                    shared[key] = encoder.shared(key, key, value)
+                else:
+                    own_fields[key] = value
+            self.send_data_to_player(socket, encoder.encode(own_fields, shared), STATE)
+
+        self.broadcast_stream(current_player_name)
+        for socket in dead:
+            # Plus de vue propre : le mort reçoit désormais le flux complet
+            self.sync_state.pop(socket, None)
+            self.watch(socket, self.players[socket]["codec"])
+        BROADCAST_SECONDS.observe(time.perf_counter() - started)
+
+    def watch(self, client_socket: socket.socket, codec: Codec) -> None:
+        """Abonne une connexion (spectateur ou joueur mort) au flux complet"""
+        if not self.viewers:
+            self.stream = None  # Flux plus tenu à jour depuis le départ de son dernier destinataire
+        self.viewers[client_socket] = codec
+        self.send_stream_snapshot(client_socket)
+
+    def broadcast_stream(self, current_player_name: str) -> None:
+        """Envoie le changement de la grille complète à tous ses destinataires.
+
+        Le diff et la trame sont calculés une fois par codec, quel que soit le
+        nombre de spectateurs : tous partagent le même numéro de séquence.
+        """
+        if not self.viewers:
+            return
+        stream = self.stream
+        if stream is None:
+            encoders = {}
+            for client_socket in self.viewers:
+                self.send_stream_snapshot(client_socket, encoders)
+            return
+
+        full_view = bytes(self.game_logic.get_full_view())
+        changes = diff_views(stream["view"], full_view, self.game_logic.size)
+        if not changes and stream["current_player"] == current_player_name:
+            return
+        stream["seq"] += 1
+        stream["view"] = full_view
+        message = {"type": "game_state_delta", "seq": stream["seq"], "changes": changes}
+        if stream["current_player"] != current_player_name:
+            stream["current_player"] = message["current_player"] = current_player_name
+        frames = {}
+        for client_socket, codec in self.viewers.items():
+            data = frames.get(codec.name)
+            if data is None:
+                data = frames[codec.name] = encode_message(message, codec)
+            self.send_data_to_player(client_socket, data, STATE)
+
+    def send_stream_snapshot(self, client_socket: socket.socket, encoders: dict = None) -> None:
+        """Envoie l'état complet du flux à un de ses destinataires (arrivée ou trou détecté)"""
+        if not self.started:
+            return  # Le flux commence avec la partie
+        if self.stream is None:
+            self.stream = {"seq": 0, "view": bytes(self.game_logic.get_full_view()),
+                           "current_player": self.current_player_name()}
+        codec = self.viewers[client_socket]
+        encoders = {} if encoders is None else encoders
+        encoder = encoders.get(codec.name)
+        if encoder is None:
+            encoder = encoders[codec.name] = SharedEncoder(codec)
+        own_fields = {
+            "type": "game_state",
+            "seq": self.stream["seq"],
+            "size": self.game_logic.size,
+            "is_your_turn": False,
+            "player_status": "dead" if client_socket in self.players else "spectator",
+            "current_player": self.stream["current_player"]
+        }
+        view = self.stream["view"]
+        shared = {"environment": encoder.shared(("environment", id(view)), "environment", view)}
+        self.send_data_to_player(client_socket, encoder.encode(own_fields, shared), STATE)
+
+    def send_snapshot(self, client_socket: socket.socket, view: bytes, fields: dict,
+                      encoder: SharedEncoder = None) -> None:
+        """Envoie l'état complet à un joueur et mémorise ce qui a été envoyé"""
+        state = self.sync_state.get(client_socket)
+        seq = state["seq"] + 1 if state else 0
+        self.sync_state[client_socket] = dict(fields, seq=seq, view=view)
+
+        encoder = encoder or SharedEncoder(self.players[client_socket]["codec"])
+        own_fields = {"type": "game_state", "seq": seq, "size": self.game_logic.size}
+        own_fields.update(fields)
+        shared = {"environment": encoder.shared(("environment", id(view)), "environment", view)}
+        self.send_data_to_player(client_socket, encoder.encode(own_fields, shared), STATE)
+
+    def current_player_name(self) -> str:
+        if self.mode == "tick":
+            return "Tous"
+        return self.players[self.current_turn]["name"] if self.current_turn else "Personne"
+
+    def player_fields(self, client_socket: socket.socket, player_name: str, current_player_name: str) -> dict:
+        """Champs d'état propres à un joueur"""
+        status = self.game_logic.players[player_name]['status']
+        return {
+            # En mode tick, tout joueur vivant peut jouer à tout moment
+            "is_your_turn": status == 'alive' if self.mode == "tick" else client_socket == self.current_turn,
+            "player_status": status,
+            "current_player": current_player_name
+        }
+
+    def request_resync(self, client_socket: socket.socket) -> None:
+        """Demande d'état complet d'un client, servie au plus une fois par RESYNC_INTERVAL.
+
+        Un client en retard qui redemanderait un instantané à chaque delta
+        aggraverait lui-même son retard.
+        """
+        now = time.monotonic()
+        last = self.resync_times.get(client_socket)
+        if last is not None and now - last < RESYNC_INTERVAL:
+            return
+        self.resync_times[client_socket] = now
+        self.resync_player(client_socket)
+
+    def resync_player(self, client_socket: socket.socket) -> None:
+        """Renvoie un instantané complet à un joueur qui a détecté un trou dans les séquences"""
+        if client_socket in self.viewers:
+            self.send_stream_snapshot(client_socket)
+            return
+        if not self.started or client_socket not in self.players:
+            return
+        player_name = self.players[client_socket]["name"]
+        if self.game_logic.players[player_name]['status'] == 'dead':
+            self.watch(client_socket, self.players[client_socket]["codec"])
+            return
+        fields = self.player_fields(client_socket, player_name, self.current_player_name())
+        self.send_snapshot(client_socket, self.game_logic.get_view(player_name), fields)
 
     def handle_move(self, client_socket: socket.socket, direction: int):
         """Gère les déplacements des joueurs"""
+        if self.mode == "tick":
+            # Le coup est gardé pour le prochain tick (seul le dernier compte)
+            if self.started and client_socket in self.players:
+                self.pending_moves[self.players[client_socket]["name"]] = direction
+            return
         if not self.started or client_socket != self.current_turn:
             return
                 
         player = self.players[client_socket]
         if self.game_logic.move_player(player["name"], direction):
+            self.log_event("move", player["name"], direction)
             # Vérifie si un joueur est mort après le mouvement
+            new_deaths = set()
             for name, player_info in self.game_logic.players.items():
                 if player_info['status'] == 'dead' and name not in self.announced_deaths:
-                    self.broadcast_system_message(f"{name} a été tué par un loup-garou!")
-                    self.announced_deaths.add(name)  # Ajoute à la liste des morts annoncées
+                    new_deaths.add(name)
+            self.announce_deaths(new_deaths)
 
-            # Passe au joueur suivant
-            player_sockets = list(self.players.keys())
-            current_index = player_sockets.index(client_socket)
-            
-            # Trouve le prochain joueur vivant
-            next_player_found = False
-            while not next_player_found:
-                current_index = (current_index + 1) % len(player_sockets)
-                next_socket = player_sockets[current_index]
-                next_player = self.players[next_socket]
-                if self.game_logic.players[next_player["name"]]['status'] == 'alive':
-                    next_player_found = True
-                    self.current_turn = next_socket
+            # Les morts quittent l'anneau des tours
+            if new_deaths:
+                for socket, player_info in self.players.items():
+                    if player_info["name"] in new_deaths:
+                        self.turns.remove(socket)
+
+            # Passe au joueur vivant suivant
+            self.skipped_turns = 0
+            self.start_turn(self.turns.advance())
             
             # Met à jour l'état pour tous les joueurs
             self.broadcast_game_state()
 
+    def announce_deaths(self, names) -> None:
+        for name in names:
+            self.log_event("death", name)
+            self.broadcast_system_message(f"{name} a été tué par un loup-garou!")
+            self.announced_deaths.add(name)  # Ajoute à la liste des morts annoncées
+
+    def schedule_tick(self) -> None:
+        if self.timers is not None:
+            self.tick_timer = self.timers.schedule(self.tick_interval, self.submit, self.run_tick)
+
+    def run_tick(self) -> None:
+        """Résout tous les coups reçus depuis le tick précédent et envoie un seul état (acteur de la room)"""
+        self.tick_timer = None
+        if not self.players:
+            return
+        if self.pending_moves:
+            moves, self.pending_moves = self.pending_moves, {}
+            self.log_event("tick", moves)
+            self.announce_deaths(self.game_logic.resolve_tick(moves))
+            self.broadcast_game_state()
+        self.schedule_tick()
+
+    def start_turn(self, client_socket) -> None:
+        """Donne la main à un joueur et arme l'échéance de son tour"""
+        self.current_turn = client_socket
+        self.turn_number += 1
+        if self.timers is None:
+            return
+        self.timers.cancel(self.turn_timer)
+        self.turn_timer = None
+        if not self.turn_timeout:
+            return
+        # Une échéance par tour, même quand personne ne joue : sinon un joueur absent
+        # bloquerait la partie (seul le joueur courant peut jouer)
+        if client_socket is not None:
+            self.turn_timer = self.timers.schedule(self.turn_timeout, self.submit, self.expire_turn,
+                                                   self.turn_number)
+
+    def expire_turn(self, turn_number: int) -> None:
+        """Passe le tour d'un joueur qui n'a pas joué à temps (exécuté par l'acteur de la room)"""
+        if turn_number != self.turn_number or self.current_turn not in self.players:
+            return  # Le joueur a joué ou est parti entre-temps
+        player_name = self.players[self.current_turn]["name"]
+        self.log_event("skip", player_name)
+        self.skipped_turns += 1
+        self.broadcast_system_message(f"{player_name} a mis trop de temps : tour passé.")
+        self.start_turn(self.turns.advance())
+        self.broadcast_game_state()
+
+    def snapshot(self) -> dict:
+        """État de la room à sauvegarder pour un redémarrage (exécuté par l'acteur de la room)"""
+        version, internal, gauss = self.rng.getstate()
+        return {
+            "game_id": self.game_id,
+            "mode": self.mode,
+            "seed": self.seed,
+            "rng": [version, list(internal), gauss],
+            "started": self.started,
+            "turn_number": self.turn_number,
+            "skipped_turns": self.skipped_turns,
+            "announced_deaths": sorted(self.announced_deaths),
+            "messages": list(self.messages),
+            "players": [[player["name"], player["role"], player["token"]] for player in self.players.values()],
+            # Ordre de jeu à partir du joueur courant, par jeton
+            "turns": [self.players[key]["token"] for key in self.turns],
+            "logic": self.game_logic.snapshot(),
+            "event_log": [self.event_log.path, self.event_log.flush()] if self.event_log else None
+        }
+
+    def restore_snapshot(self, data: dict) -> None:
+        """Reprend l'état enregistré par snapshot() dans une room neuve.
+
+        Chaque joueur y est représenté par une OfflineSeat jusqu'à ce qu'il
+        revienne avec son jeton (rebind_player) ; les tours des absents passent
+        à l'échéance habituelle.
+        """
+        version, internal, gauss = data["rng"]
+        self.seed = data["seed"]
+        self.rng.setstate((version, tuple(internal), gauss))
+        self.game_logic = GameLogic.restore(data["logic"], self.rng)
+        self.started = data["started"]
+        self.turn_number = data["turn_number"]
+        self.skipped_turns = data["skipped_turns"]
+        self.announced_deaths = set(data["announced_deaths"])
+        self.messages.extend(data["messages"])
+        self.chat_count = len(self.messages)
+        for name, role, token in data["players"]:
+            seat = OfflineSeat(token)
+            self.players[seat] = {
+                "name": name,
+                "role": role,
+                "codec": JSON_CODEC,  # Remplacé par celui de la nouvelle connexion
+                "chat_bucket": TokenBucket(),
+                "token": token
+            }
+            self.tokens[token] = seat
+        self.turns = TurnRing(self.tokens[token] for token in data["turns"])
+        if data["event_log"]:
+            self.event_log = resume_room_log(*data["event_log"])
+        self.log_event("restore", self.turn_number)
+
+        if self.started:
+            if self.mode == "tick":
+                self.schedule_tick()
+            else:
+                self.start_turn(self.turns.current)
+
     def send_message_to_player(self, client_socket: socket.socket, message: dict):
         """Envoie un message à un joueur spécifique"""
+        player = self.players.get(client_socket)
+        codec = player["codec"] if player else self.spectators.get(client_socket, JSON_CODEC)
+        self.send_data_to_player(client_socket, encode_message(message, codec))
+
+    def send_data_to_player(self, client_socket: socket.socket, data: bytes, kind: str = CONTROL):
+        """Place une trame déjà encodée dans la file d'envoi d'un joueur (jamais bloquant)"""
         try:
-            client_socket.send(json.dumps(message).encode())
+            client_socket.send_frame(data, kind)
         except Exception as e:
             print(f"Erreur d'envoi: {str(e)}")
 
 class GameServer:
-    def __init__(self, host: str = 'localhost', port: int = 12345):
+    def __init__(self, host: str = 'localhost', port: int = 12345, engine: str = "threading",
+                 turn_timeout: float = TURN_TIMEOUT, tick_interval: float = TICK_INTERVAL,
+                 metrics_port: int = 0, send_queue_bytes: int = MAX_QUEUE_BYTES,
+                 overflow_policy: str = "coalesce", event_log_dir: str = None, snapshot_path: str = None,
+                 snapshot_interval: float = SNAPSHOT_INTERVAL, match_room_size: int = MATCH_ROOM_SIZE,
+                 reconnect_grace: float = RECONNECT_GRACE, heartbeat_interval: float = HEARTBEAT_INTERVAL,
+                 heartbeat_timeout: float = HEARTBEAT_TIMEOUT):
+        if engine not in ENGINES:
+            raise ValueError(f"Moteur inconnu: {engine} (choix: {', '.join(ENGINES)})")
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique inconnue: {overflow_policy} (choix: {', '.join(OVERFLOW_POLICIES)})")
         self.host = host
         self.port = port
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.engine = engine
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM) if engine == "threading" else None
         self.rooms: Dict[str, GameRoom] = {}
         self.client_room: Dict[socket.socket, str] = {}  # socket -> game_id
+        # Ne protège que la création/suppression des rooms, pas les commandes de jeu
+        self.rooms_lock = threading.Lock()
+        self.actor_factory = AsyncRoomActor if engine == "asyncio" else RoomActor
+        # Une seule roue de timers pour les échéances et les ticks de toutes les rooms
+        self.turn_timeout = turn_timeout  # 0 = pas de limite
+        self.tick_interval = tick_interval
+        self.timers = TimerWheel()
+        self.metrics_port = metrics_port  # 0 = pas d'endpoint HTTP
+        # File d'envoi bornée par client et politique quand elle déborde
+        self.send_queue_bytes = send_queue_bytes
+        self.overflow_policy = overflow_policy
+        # Un journal d'événements par room dans ce dossier (None = pas de journal)
+        self.event_log_dir = event_log_dir
+        # Sauvegarde périodique des rooms dans ce fichier, relu au démarrage (None = désactivé)
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.room_snapshots: Dict[str, tuple] = {}  # game_id -> (version de la room, snapshot)
+        self.snapshot_lock = threading.Lock()
+        # Place gardée à un joueur coupé en pleine partie (0 = retiré immédiatement)
+        self.reconnect_grace = reconnect_grace
+        # Parties "n'importe laquelle" (game_id "*") et rooms vides réutilisables
+        self.matchmaker = Matchmaker(match_room_size)
+        self.pool = RoomPool(self.new_room)
+        # Pings et fermeture des connexions muettes (intervalle 0 = désactivé)
+        self.heartbeats = Heartbeats(self.timers, heartbeat_interval, heartbeat_timeout)
+        REGISTRY.gauge("loupgarou_rooms", "Rooms ouvertes", callback=lambda: len(self.rooms))
+        REGISTRY.gauge("loupgarou_pooled_rooms", "Rooms vides gardées pour être réutilisées",
+                       callback=lambda: len(self.pool))
+        REGISTRY.gauge("loupgarou_room_players", "Joueurs par room", ("game_id",),
+                       callback=lambda: {(game_id,): len(room.players) for game_id, room in list(self.rooms.items())})
+        REGISTRY.gauge("loupgarou_room_spectators", "Spectateurs par room", ("game_id",),
+                       callback=lambda: {(game_id,): len(room.spectators) for game_id, room in list(self.rooms.items())})
+        REGISTRY.gauge("loupgarou_player_rtt_seconds", "Dernier aller-retour ping/pong de chaque joueur",
+                       ("game_id", "player"), callback=self.player_rtts)
+
+    def new_room(self, game_id: str, size: int, mode: str, event_log: EventLog = None) -> GameRoom:
+        return GameRoom(game_id, self.actor_factory, size, self.timers, self.turn_timeout, mode,
+                        self.tick_interval, event_log)
 
     def start(self):
         """Démarre le serveur"""
+        if self.metrics_port:
+            start_metrics_server(self.host, self.metrics_port)
+
+        if self.engine == "asyncio":
+            asyncio.run(self.serve_async())
+            return
+
+        self.start_services()
+        # Redémarrage immédiat sur le même port, malgré les connexions en TIME_WAIT
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen()
+        self.server_socket.listen(LISTEN_BACKLOG)
         print(f"Serveur démarré sur {self.host}:{self.port}")
 
+        try:
+            while True:
+                client_socket, address = self.server_socket.accept()
+                print(f"Nouvelle connexion de {address}")
+                threading.Thread(target=self.handle_client, args=(client_socket,), daemon=True).start()
+        finally:
+            # Arrêt propre (Ctrl-C) : dernier snapshot, les acteurs des rooms tournent encore
+            if self.snapshot_path:
+                self.save_snapshot()
+
+    def player_rtts(self) -> dict:
+        rtts = {}
+        for game_id, room in list(self.rooms.items()):
+            for connection, player in list(room.players.items()):
+                rtt = self.heartbeats.rtt(connection)
+                if rtt is not None:
+                    rtts[(game_id, player["name"])] = rtt
+        return rtts
+
+    def start_services(self):
+        """Restaure le dernier snapshot et lance les tâches de fond (snapshots, heartbeats).
+
+        À appeler une fois, depuis la boucle asyncio pour ce moteur : les
+        connexions StreamConnection ne s'utilisent que depuis cette boucle.
+        """
+        self.start_snapshots()
+        dispatch = asyncio.get_running_loop().call_soon_threadsafe if self.engine == "asyncio" else None
+        self.heartbeats.start(dispatch)
+
+    def start_snapshots(self):
+        """Restaure les rooms du dernier snapshot et lance la sauvegarde périodique.
+
+        À appeler une fois, depuis la boucle asyncio pour ce moteur (les acteurs
+        des rooms restaurées y sont rattachés).
+        """
+        if not self.snapshot_path:
+            return
+        try:
+            rooms = read_snapshot(self.snapshot_path)
+        except SnapshotError as e:
+            print(f"Snapshot ignoré: {str(e)}")
+            rooms = []
+        for data in rooms:
+            self.restore_room(data)
+        if rooms:
+            print(f"{len(self.rooms)} room(s) restaurée(s) depuis {self.snapshot_path}")
+        threading.Thread(target=self.run_snapshots, name="snapshots", daemon=True).start()
+
+    def restore_room(self, data: dict):
+        """Recrée une room sauvegardée ; ses joueurs ont RESTORE_GRACE secondes pour revenir"""
+        room = self.new_room(data["game_id"], data["logic"]["size"], data["mode"])
+        try:
+            room.restore_snapshot(data)
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"Room {data.get('game_id')} non restaurée: {str(e)}")
+            room.close()
+            room.actor.stop()
+            return
+        with self.rooms_lock:
+            self.rooms[room.game_id] = room
+        self.room_snapshots[room.game_id] = (room.version, data)
+        for seat in list(room.players):
+            self.timers.schedule(RESTORE_GRACE, room.submit, self.expire_seat, room, seat)
+
+    def expire_seat(self, room: GameRoom, seat: OfflineSeat):
+        """Libère la place d'un joueur qui n'est pas revenu à temps (exécuté par l'acteur de la room)"""
+        if seat in room.players:
+            self.leave_room(room, seat)
+
+    def run_snapshots(self):
         while True:
-            client_socket, address = self.server_socket.accept()
-            print(f"Nouvelle connexion de {address}")
-            threading.Thread(target=self.handle_client, args=(client_socket,), daemon=True).start()
+            time.sleep(self.snapshot_interval)
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                print(f"Erreur de snapshot: {str(e)}")
+
+    def save_snapshot(self, timeout: float = SNAPSHOT_TIMEOUT):
+        """Capture les rooms modifiées depuis la dernière sauvegarde et réécrit le fichier.
 
-    def handle_client(self, client_socket: socket.socket):
+        Chaque capture est faite par l'acteur de la room (état cohérent, sans
+        verrou) ; une room qui ne répond pas à temps garde son snapshot précédent.
+        """
+        with self.snapshot_lock:
+            self.save_changed_rooms(timeout)
+
+    def save_changed_rooms(self, timeout: float):
+        with self.rooms_lock:
+            rooms = list(self.rooms.values())
+        futures = []
+        for room in rooms:
+            saved = self.room_snapshots.get(room.game_id)
+            if saved is None or saved[0] != room.version:
+                future = concurrent.futures.Future()
+                room.submit(self.capture_room, room, future)
+                futures.append((room.game_id, future))
+        concurrent.futures.wait([future for _, future in futures], timeout)
+
+        changed = False
+        for game_id, future in futures:
+            if future.done() and future.exception() is None:
+                self.room_snapshots[game_id] = future.result()
+                changed = True
+        live = {room.game_id for room in rooms}
+        for game_id in list(self.room_snapshots):
+            if game_id not in live:
+                del self.room_snapshots[game_id]
+                changed = True
+        if changed:
+            write_snapshot(self.snapshot_path, [data for _, data in self.room_snapshots.values()])
+
+    def capture_room(self, room: GameRoom, future: concurrent.futures.Future):
+        """Capture l'état d'une room (exécuté par l'acteur de la room)"""
+        try:
+            future.set_result((room.version, room.snapshot()))
+        except Exception as e:
+            future.set_exception(e)
+
+    def handle_client(self, sock: socket.socket, initial: bytes = b""):
         """Gère les connexions individuelles des clients"""
+        client_socket = SocketConnection(sock, self.send_queue_bytes, self.overflow_policy)
+        CONNECTIONS.inc()
+        self.heartbeats.register(client_socket)
+        decoder = FrameDecoder()
         try:
+            for message in decoder.feed_messages(initial):
+                self.process_message(client_socket, message)
             while True:
-                data = client_socket.recv(1024).decode()
+                data = client_socket.recv(RECV_SIZE)
                 if not data:
                     break
-
-                message = json.loads(data)
-                self.process_message(client_socket, message)
+                self.heartbeats.seen(client_socket)
+                BYTES_RECEIVED.inc(len(data))
+                for message in decoder.feed_messages(data):
+                    self.process_message(client_socket, message)
 
         except Exception as e:
+            CONNECTION_ERRORS.inc()
             print(f"Erreur de connexion: {str(e)}")
         finally:
+            self.heartbeats.forget(client_socket)
             self.disconnect_client(client_socket)
 
+    async def serve_async(self):
+        """Boucle principale du moteur asyncio : une coroutine par connexion au lieu d'un thread"""
+        server = await asyncio.start_server(
+            self.handle_client_async, self.host, self.port, backlog=LISTEN_BACKLOG
+        )
+        self.start_services()
+        print(f"Serveur démarré sur {self.host}:{self.port} (asyncio)")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                  initial: bytes = b""):
+        """Équivalent asyncio de handle_client"""
+        connection = StreamConnection(reader, writer, self.send_queue_bytes, self.overflow_policy)
+        print(f"Nouvelle connexion de {connection.getpeername()}")
+        CONNECTIONS.inc()
+        self.heartbeats.register(connection)
+        decoder = FrameDecoder()
+        try:
+            for message in decoder.feed_messages(initial):
+                self.process_message(connection, message)
+            while True:
+                data = await reader.read(RECV_SIZE)
+                if not data:
+                    break
+                self.heartbeats.seen(connection)
+                BYTES_RECEIVED.inc(len(data))
+                for message in decoder.feed_messages(data):
+                    self.process_message(connection, message)
+
+        except Exception as e:
+            CONNECTION_ERRORS.inc()
+            print(f"Erreur de connexion: {str(e)}")
+        finally:
+            self.heartbeats.forget(connection)
+            self.disconnect_client(connection)
+
     def process_message(self, client_socket: socket.socket, message: dict):
         """Traite les messages reçus des clients"""
         message_type = message.get("type")
         game_id = message.get("game_id")
+        # Étiquette bornée : un client ne peut pas créer une série par type inventé
+        MESSAGES_RECEIVED.inc(1, (message_type if message_type in CLIENT_MESSAGE_TYPES else "autre",))
 
         if message_type == "connection":
             self.handle_connection(client_socket, message)
@@ -221,83 +989,302 @@ class GameServer:
             self.handle_move(client_socket, message)
         elif message_type == "disconnect":
             self.handle_disconnect(client_socket, message)
+        elif message_type == "resync":
+            self.handle_resync(client_socket, game_id)
+        elif message_type == "pong":
+            self.heartbeats.pong(client_socket, message.get("id"))
 
     def handle_start_game(self, client_socket: socket.socket, game_id: str):
         """Gère la demande de démarrage de partie"""
-        if game_id in self.rooms:
-            room = self.rooms[game_id]
+        room = self.rooms.get(game_id)
+        if room:
+            room.submit(self.start_room, room, client_socket)
+
+    def start_room(self, room: GameRoom, client_socket: socket.socket):
+        """Démarrage demandé par un joueur (exécuté par l'acteur de la room)"""
+        if client_socket in room.spectators:
+            return
+        with self.rooms_lock:
+            matchmade = room.game_id in self.matchmaker.queues
+        if matchmade and len(room.players) >= room.min_players:
+            self.autostart(room)  # Les places déjà attribuées doivent rejoindre avant le démarrage
+        else:
             room.start_game(client_socket)
 
+    def handle_resync(self, client_socket: socket.socket, game_id: str):
+        """Gère une demande d'état complet (trou détecté dans les deltas)"""
+        room = self.rooms.get(game_id)
+        if room:
+            room.submit(room.request_resync, client_socket)
+
     def handle_disconnect(self, client_socket: socket.socket, message: dict):
         """Gère la déconnexion volontaire d'un client"""
-        self.disconnect_client(client_socket)
+        # Plus de ping : arrivé après la fermeture côté client, il provoquerait un RST
+        self.heartbeats.forget(client_socket)
+        self.disconnect_client(client_socket, voluntary=True)
 
-    def disconnect_client(self, client_socket: socket.socket):
+    def disconnect_client(self, client_socket: socket.socket, voluntary: bool = False):
         """Gère la déconnexion d'un client"""
+        with self.rooms_lock:
+            game_id = self.client_room.pop(client_socket, None)
+            room = self.rooms.get(game_id)
+
+        if room:
+            room.submit(self.leave_room if voluntary else self.drop_connection, room, client_socket)
+        else:
+            client_socket.close()
+
+    def drop_connection(self, room: GameRoom, client_socket: socket.socket):
+        """Connexion perdue (exécuté par l'acteur de la room).
+
+        En pleine partie, la place du joueur lui est gardée reconnect_grace
+        secondes : il la retrouve en se reconnectant avec son jeton de session.
+        """
+        if not (room.started and self.reconnect_grace and client_socket in room.players):
+            self.leave_room(room, client_socket)
+            return
+        seat = room.detach_player(client_socket)
+        client_socket.close()
+        self.timers.schedule(self.reconnect_grace, room.submit, self.expire_seat, room, seat)
+
+    def leave_room(self, room: GameRoom, client_socket: socket.socket):
+        """Retire le joueur (ou le spectateur) de sa room (exécuté par l'acteur de la room)"""
+        spectator = client_socket in room.spectators
+        if not spectator and client_socket not in room.players:
+            # Place reprise entre-temps par une nouvelle connexion (rebind_player) : personne ne part
+            client_socket.close()
+            if not room.players:
+                self.release_if_empty(room, room.game_id)
+            return
         try:
-            if client_socket in self.client_room:
-                game_id = self.client_room[client_socket]
-                room = self.rooms.get(game_id)
-                if room:
-                    # Récupérer le nom du joueur avant de le supprimer
-                    player_name = room.players.get(client_socket, "Un joueur")
-                    room.remove_player(client_socket)
-                    if not room.players:  # Si la room est vide
-                        del self.rooms[game_id]
-                del self.client_room[client_socket]
+            if spectator:
+                room.remove_spectator(client_socket)
+            else:
+                room.remove_player(client_socket)
         finally:
             client_socket.close()
 
+        if not room.players:
+            self.release_if_empty(room, room.game_id)
+        elif not room.started and not spectator:
+            with self.rooms_lock:
+                self.matchmaker.release(room.game_id)
+
+    def release_if_empty(self, room: GameRoom, game_id: str):
+        """Supprime une room vide (exécuté par l'acteur de la room).
+
+        Tant que des commandes attendent dans la file (timer, capture, connexion
+        planifiée), la vérification est replanifiée derrière elles : une room
+        vide finit toujours par quitter self.rooms.
+        """
+        with self.rooms_lock:
+            # Room déjà supprimée, ou reprise depuis le pool pour une autre partie
+            if room.players or room.game_id != game_id or self.rooms.get(game_id) is not room:
+                return
+            if not room.actor.is_idle():
+                room.submit(self.release_if_empty, room, game_id)
+                return
+            del self.rooms[game_id]
+            self.matchmaker.close(game_id)
+            # Plus rien à regarder : les spectateurs sont déconnectés
+            for viewer in room.spectators:
+                self.client_room.pop(viewer, None)
+                viewer.close()
+            room.close()
+            # La room vide retourne au pool avec son acteur ; pool plein : l'acteur s'arrête
+            if not self.pool.release(room):
+                room.actor.stop()
+
     def handle_connection(self, client_socket: socket.socket, message: dict):
         """Gère les nouvelles connexions"""
         game_id = message.get("game_id")
         player_name = message.get("name")
+        # Taille de carte et mode optionnels, utilisés seulement à la création de la room
+        size = message.get("size", DEFAULT_SIZE)
+        if not is_valid_size(size):
+            send_message(client_socket, {
+                "type": "error",
+                "content": f"Taille de carte invalide: {size}"
+            })
+            return
 
-        if game_id not in self.rooms:
-            self.rooms[game_id] = GameRoom(game_id)
+        mode = message.get("mode", "turns")
+        if mode not in MODES:
+            send_message(client_socket, {
+                "type": "error",
+                "content": f"Mode de jeu invalide: {mode}"
+            })
+            return
 
-        room = self.rooms[game_id]
-        # Plus de rôle à la connexion
-        room.add_player(client_socket, player_name)
-        self.client_room[client_socket] = game_id
+        # Le client propose ses codecs par ordre de préférence ; l'accusé est toujours en JSON
+        codec = negotiate_codec(message.get("codecs"))
+        if codec is not JSON_CODEC:
+            send_message(client_socket, {"type": "codec", "codec": codec.name})
 
-        room.broadcast_system_message(f"{player_name} a rejoint la partie!")
+        if message.get("spectate") is True:
+            self.handle_spectator(client_socket, game_id, codec)
+            return
 
-    def handle_chat_message(self, client_socket: socket.socket, message: dict):
-        """Gère les messages de chat"""
-        game_id = message.get("game_id")
-        if game_id in self.rooms:
-            room = self.rooms[game_id]
-            chat_message = {
-                "type": "chat",
-                "player": message.get("player"),
-                "content": message.get("content")
-            }
-            room.broadcast_message(chat_message)
+        with self.rooms_lock:
+            matchmaking = game_id == ANY_GAME
+            if matchmaking:
+                game_id = self.matchmaker.assign(queue_key(size, mode), self.rooms)
+            room = self.rooms.get(game_id)
+            if room is None:
+                event_log = open_room_log(self.event_log_dir, game_id) if self.event_log_dir else None
+                room = self.rooms[game_id] = self.pool.acquire(game_id, size, mode, event_log)
+            self.client_room[client_socket] = game_id
+            token = message.get("token")
+            if matchmaking:
+                room.submit(self.join_match, room, client_socket, player_name, codec)
+            elif isinstance(token, str):
+                room.submit(self.rejoin_room, room, client_socket, token, player_name, codec)
+            else:
+                room.submit(self.join_room, room, client_socket, player_name, codec)
 
-    def disconnect_client(self, client_socket: socket.socket):
-        """Gère la déconnexion d'un client"""
-        if client_socket in self.client_room:
-            game_id = self.client_room[client_socket]
+    def handle_spectator(self, client_socket: socket.socket, game_id: str, codec: Codec = JSON_CODEC):
+        """Fait entrer un spectateur dans une partie existante"""
+        with self.rooms_lock:
             room = self.rooms.get(game_id)
-            if room:
-                room.remove_player(client_socket)
-                if not room.players:  # Si la room est vide
-                    del self.rooms[game_id]
-            del self.client_room[client_socket]
-        client_socket.close()
+            if room is not None:
+                self.client_room[client_socket] = game_id
+        if room is None:
+            send_message(client_socket, {
+                "type": "error",
+                "content": f"Partie introuvable: {game_id}"
+            }, codec)
+            return
+        room.submit(self.join_as_spectator, room, client_socket, codec)
+
+    def join_as_spectator(self, room: GameRoom, client_socket: socket.socket, codec: Codec = JSON_CODEC):
+        """Ajoute le spectateur à la room (exécuté par l'acteur de la room)"""
+        if not room.players:
+            self.leave_room(room, client_socket)  # La room s'est vidée entre-temps
+            return
+        room.add_spectator(client_socket, codec)
+
+    def rejoin_room(self, room: GameRoom, client_socket: socket.socket, token: str, player_name: str,
+                    codec: Codec = JSON_CODEC):
+        """Rend sa place au joueur qui présente un jeton de session, sinon le fait rejoindre (acteur de la room)"""
+        if room.rebind_player(token, client_socket, codec):
+            RECONNECTS.inc()
+            room.broadcast_system_message(f"{room.players[client_socket]['name']} est de retour!")
+        else:
+            self.join_room(room, client_socket, player_name, codec)
+
+    def join_room(self, room: GameRoom, client_socket: socket.socket, player_name: str,
+                  codec: Codec = JSON_CODEC):
+        """Ajoute le joueur à la room (exécuté par l'acteur de la room)"""
+        if room.started:
+            # Partie en cours (ou jeton expiré) : aucune place dans la grille, il la suit en spectateur
+            room.add_spectator(client_socket, codec)
+            room.send_message_to_player(client_socket, {
+                "type": "error",
+                "content": "Partie déjà commencée : vous la suivez en spectateur"
+            })
+            return
+        # Plus de rôle à la connexion
+        room.add_player(client_socket, player_name, codec)
+        room.broadcast_system_message(f"{player_name} a rejoint la partie!")
+
+    def join_match(self, room: GameRoom, client_socket: socket.socket, player_name: str,
+                   codec: Codec = JSON_CODEC):
+        """Place un joueur du matchmaking et démarre sa room quand elle est assez remplie (acteur de la room)"""
+        room.send_data_to_player(client_socket, encode_message({"type": "matched", "game_id": room.game_id}, codec))
+        self.join_room(room, client_socket, player_name, codec)
+        if len(room.players) >= self.matchmaker.room_size:
+            self.autostart(room)
+        elif len(room.players) >= room.min_players and room.start_timer is None:
+            room.start_timer = self.timers.schedule(MATCH_START_DELAY, room.submit, self.autostart, room)
+
+    def autostart(self, room: GameRoom):
+        """Scelle une room du matchmaking puis la démarre (exécuté par l'acteur de la room)"""
+        self.timers.cancel(room.start_timer)
+        room.start_timer = None
+        if room.started:
+            return
+        with self.rooms_lock:
+            self.matchmaker.seal(room.game_id)
+        # Les joueurs placés avant le scellement sont déjà dans la file de l'acteur : ils
+        # rejoignent la room avant son démarrage
+        room.submit(self.start_match, room)
+
+    def start_match(self, room: GameRoom):
+        if not room.started and len(room.players) >= room.min_players:
+            room.start_game(None)
+            with self.rooms_lock:
+                self.matchmaker.close(room.game_id)
+        else:
+            with self.rooms_lock:
+                self.matchmaker.unseal(room.game_id)
+
+    def handle_chat_message(self, client_socket: socket.socket, message: dict):
+        """Gère les messages de chat (le champ player envoyé par le client est ignoré)"""
+        room = self.rooms.get(message.get("game_id"))
+        if room:
+            room.submit(room.post_chat, client_socket, message.get("content"))
 
     def handle_move(self, client_socket: socket.socket, message: dict):
         """Gère les déplacements des joueurs"""
-        game_id = message.get("game_id")
+        room = self.rooms.get(message.get("game_id"))
         direction = message.get("direction")
-        
-        if game_id in self.rooms:
-            room = self.rooms[game_id]
-            room.handle_move(client_socket, direction)
+        if room and isinstance(direction, int) and not isinstance(direction, bool):
+            room.submit(room.handle_move, client_socket, direction)
 
 if __name__ == "__main__":
-    server = GameServer()
+    parser = argparse.ArgumentParser(description="Serveur Loup-Garou")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--engine", choices=ENGINES, default="threading")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Nombre de processus workers (0 = un seul processus)")
+    parser.add_argument("--turn-timeout", type=float, default=TURN_TIMEOUT,
+                        help="Secondes avant qu'un tour ne passe automatiquement (0 = jamais)")
+    parser.add_argument("--tick-interval", type=float, default=TICK_INTERVAL,
+                        help="Intervalle entre deux ticks des parties en mode temps réel (s)")
+    parser.add_argument("--send-queue-bytes", type=int, default=MAX_QUEUE_BYTES,
+                        help="Taille maximale de la file d'envoi de chaque client (octets)")
+    parser.add_argument("--overflow-policy", choices=OVERFLOW_POLICIES, default="coalesce",
+                        help="Que faire quand la file d'envoi d'un client est pleine")
+    parser.add_argument("--event-log", default=None, metavar="DOSSIER",
+                        help="Écrit le journal d'événements de chaque room dans ce dossier (voir replay.py)")
+    parser.add_argument("--match-room-size", type=int, default=MATCH_ROOM_SIZE,
+                        help="Joueurs par partie du matchmaking (game_id \"*\")")
+    parser.add_argument("--reconnect-grace", type=float, default=RECONNECT_GRACE,
+                        help="Secondes pendant lesquelles un joueur coupé en pleine partie garde sa place (0 = aucune)")
+    parser.add_argument("--heartbeat-interval", type=float, default=HEARTBEAT_INTERVAL,
+                        help="Secondes entre deux pings envoyés aux clients (0 = désactivé)")
+    parser.add_argument("--heartbeat-timeout", type=float, default=HEARTBEAT_TIMEOUT,
+                        help="Secondes de silence avant de fermer une connexion (0 = jamais)")
+    parser.add_argument("--snapshot", default=None, metavar="FICHIER",
+                        help="Sauvegarde les rooms dans ce fichier et les restaure au démarrage "
+                             "(worker i utilise FICHIER.i)")
+    parser.add_argument("--snapshot-interval", type=float, default=SNAPSHOT_INTERVAL,
+                        help="Secondes entre deux sauvegardes des rooms modifiées")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Port HTTP de /metrics (0 = désactivé ; worker i utilise port + i)")
+    args = parser.parse_args()
+
+    options = {
+        "engine": args.engine,
+        "turn_timeout": args.turn_timeout,
+        "tick_interval": args.tick_interval,
+        "metrics_port": args.metrics_port,
+        "send_queue_bytes": args.send_queue_bytes,
+        "overflow_policy": args.overflow_policy,
+        "event_log_dir": args.event_log,
+        "snapshot_path": args.snapshot,
+        "snapshot_interval": args.snapshot_interval,
+        "match_room_size": args.match_room_size,
+        "reconnect_grace": args.reconnect_grace,
+        "heartbeat_interval": args.heartbeat_interval,
+        "heartbeat_timeout": args.heartbeat_timeout
+    }
+    if args.workers:
+        from sharding import ShardedServer
+        server = ShardedServer(args.host, args.port, workers=args.workers, **options)
+    else:
+        server = GameServer(args.host, args.port, **options)
     try:
         server.start()
     except KeyboardInterrupt:
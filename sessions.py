@@ -0,0 +1,37 @@
+import secrets
+from typing import Optional
+from connection import CONTROL
+
+TOKEN_BYTES = 16
+RECONNECT_GRACE = 30.0  # Temps pendant lequel la place d'un joueur coupé en pleine partie lui est gardée (s)
+
+
+def new_token() -> str:
+    """Jeton de session remis à un joueur : lui seul peut reprendre sa place avec"""
+    return secrets.token_urlsafe(TOKEN_BYTES)
+
+
+class OfflineSeat:
+    """Place d'un joueur sans connexion (coupure réseau, room restaurée d'un snapshot).
+
+    Tient lieu de socket dans GameRoom.players, avec la même interface que
+    SocketConnection : les trames qui lui sont destinées sont simplement
+    ignorées jusqu'à ce que le joueur revienne avec son jeton.
+    """
+
+    def __init__(self, token: str, chat_seen: Optional[int] = None):
+        self.token = token
+        # Nombre de messages de chat déjà reçus par le joueur (None : inconnu, tout l'historique est renvoyé)
+        self.chat_seen = chat_seen
+
+    def send_frame(self, data: bytes, kind: str = CONTROL) -> None:
+        pass
+
+    def sendall(self, data: bytes) -> None:
+        pass
+
+    def getpeername(self):
+        return None
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,179 @@
+import asyncio
+import multiprocessing
+import os
+import selectors
+import socket
+import threading
+import zlib
+from typing import Dict, List, Tuple
+from protocol import FrameDecoder, ProtocolError, decode_message
+from game_logic import DEFAULT_SIZE
+from lobby import ANY_GAME, queue_key
+from metrics import start_metrics_server
+from server import GameServer
+
+# Taille maximale des données lues par l'acceptor avant de transmettre la socket
+HANDSHAKE_LIMIT = 64 * 1024
+
+
+def shard_for(game_id: str, nb_shards: int) -> int:
+    """Choisit le worker d'une partie (hash stable entre processus, contrairement à hash())"""
+    return zlib.crc32(str(game_id).encode()) % nb_shards
+
+
+def receive_client(channel: socket.socket) -> Tuple[socket.socket, bytes]:
+    """Reçoit une socket cliente et les données déjà lues par l'acceptor"""
+    initial, fds, _, _ = socket.recv_fds(channel, HANDSHAKE_LIMIT, 1)
+    if not fds:
+        raise ConnectionError("Canal vers l'acceptor fermé")
+    return socket.socket(fileno=fds[0]), initial
+
+
+def run_worker(index: int, nb_workers: int, channel: socket.socket, options: dict) -> None:
+    """Point d'entrée d'un processus worker : un GameServer complet avec ses propres rooms"""
+    options = dict(options)
+    metrics_port = options.pop("metrics_port", 0)
+    if options.get("snapshot_path"):
+        # Une partie revient toujours sur le même worker (à nombre de workers égal)
+        options["snapshot_path"] = f"{options['snapshot_path']}.{index}"
+    server = GameServer(**options)
+    # Les parties créées par le matchmaking doivent revenir sur ce worker à la reconnexion
+    server.matchmaker.owns = lambda game_id: shard_for(game_id, nb_workers) == index
+    print(f"Worker {index} démarré (pid {os.getpid()})")
+    if metrics_port:
+        # Chaque worker a son propre registre, donc son propre port
+        start_metrics_server(server.host, metrics_port + index)
+    try:
+        if server.engine == "asyncio":
+            asyncio.run(serve_channel_async(server, channel))
+        else:
+            server.start_services()
+            while True:
+                client_socket, initial = receive_client(channel)
+                threading.Thread(target=server.handle_client, args=(client_socket, initial), daemon=True).start()
+    except (ConnectionError, KeyboardInterrupt):
+        # Les acteurs du moteur threading tournent encore : dernier snapshot avant de quitter
+        if server.snapshot_path and server.engine == "threading":
+            server.save_snapshot()
+
+
+async def serve_channel_async(server: GameServer, channel: socket.socket) -> None:
+    """Version asyncio : les sockets reçues sont rattachées à la boucle du worker"""
+    loop = asyncio.get_running_loop()
+    server.start_services()
+    while True:
+        client_socket, initial = await loop.run_in_executor(None, receive_client, channel)
+        reader, writer = await asyncio.open_connection(sock=client_socket)
+        loop.create_task(server.handle_client_async(reader, writer, initial))
+
+
+class ShardedServer:
+    """Acceptor frontal qui répartit les connexions sur plusieurs processus GameServer.
+
+    L'acceptor lit uniquement le premier message (connection) pour connaître le
+    game_id, puis transmet le descripteur de la socket au worker choisi via une
+    socket Unix (SCM_RIGHTS). Une partie est donc toujours gérée par le même worker.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 12345, workers: int = None, **options):
+        self.host = host
+        self.port = port
+        self.nb_workers = workers or os.cpu_count() or 1
+        # Options transmises telles quelles au GameServer de chaque worker (engine, turn_timeout...)
+        self.options = options
+        self.channels: List[socket.socket] = []
+        self.processes: List[multiprocessing.Process] = []
+        self.pending: Dict[socket.socket, Tuple[FrameDecoder, bytearray]] = {}
+        self.selector = selectors.DefaultSelector()
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    def start_workers(self) -> None:
+        """Lance un processus par shard, relié à l'acceptor par une socket Unix"""
+        for index in range(self.nb_workers):
+            parent_end, child_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            # spawn : les workers n'héritent pas des canaux des autres shards
+            process = multiprocessing.get_context("spawn").Process(
+                target=run_worker, args=(index, self.nb_workers, child_end, self.options), daemon=True
+            )
+            process.start()
+            child_end.close()
+            self.channels.append(parent_end)
+            self.processes.append(process)
+
+    def start(self) -> None:
+        """Démarre les workers puis la boucle d'acceptation"""
+        self.start_workers()
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen(1024)
+        self.server_socket.setblocking(False)
+        self.selector.register(self.server_socket, selectors.EVENT_READ)
+        print(f"Acceptor démarré sur {self.host}:{self.port} ({self.nb_workers} workers)")
+
+        try:
+            while True:
+                for key, _ in self.selector.select():
+                    if key.fileobj is self.server_socket:
+                        self.accept()
+                    else:
+                        try:
+                            self.read_handshake(key.fileobj)
+                        except Exception as e:
+                            # Une connexion fautive ne doit jamais arrêter l'acceptor et ses workers
+                            print(f"Erreur de connexion: {str(e)}")
+                            if key.fileobj in self.pending:
+                                self.drop(key.fileobj)
+        finally:
+            for process in self.processes:
+                process.terminate()
+
+    def accept(self) -> None:
+        try:
+            client_socket, address = self.server_socket.accept()
+        except BlockingIOError:
+            return
+        client_socket.setblocking(False)
+        self.pending[client_socket] = (FrameDecoder(HANDSHAKE_LIMIT), bytearray())
+        self.selector.register(client_socket, selectors.EVENT_READ)
+
+    def read_handshake(self, client_socket: socket.socket) -> None:
+        """Accumule les données jusqu'au premier message complet puis transmet la socket"""
+        decoder, raw = self.pending[client_socket]
+        try:
+            data = client_socket.recv(HANDSHAKE_LIMIT)
+            if not data or len(raw) + len(data) > HANDSHAKE_LIMIT:
+                raise ConnectionError("Handshake interrompu")
+            raw += data
+            frames = decoder.feed(data)
+            if not frames:
+                return
+            message = decode_message(frames[0])
+        except (OSError, ProtocolError) as e:
+            print(f"Erreur de connexion: {str(e)}")
+            self.drop(client_socket)
+            return
+        if not isinstance(message, dict):
+            print("Erreur de connexion: handshake invalide")
+            self.drop(client_socket)
+            return
+
+        game_id = message.get("game_id")
+        if game_id == ANY_GAME:
+            # Tous les joueurs d'une même file de matchmaking se retrouvent sur le même worker
+            game_id = queue_key(message.get("size", DEFAULT_SIZE), message.get("mode", "turns"))
+        shard = shard_for(game_id, len(self.channels))
+        self.selector.unregister(client_socket)
+        del self.pending[client_socket]
+        client_socket.setblocking(True)
+        try:
+            socket.send_fds(self.channels[shard], [bytes(raw)], [client_socket.fileno()])
+        except OSError as e:
+            print(f"Erreur de transmission au worker {shard}: {str(e)}")
+        finally:
+            # Le worker possède désormais son propre descripteur
+            client_socket.close()
+
+    def drop(self, client_socket: socket.socket) -> None:
+        self.selector.unregister(client_socket)
+        del self.pending[client_socket]
+        client_socket.close()
@@ -0,0 +1,44 @@
+import json
+import os
+import time
+from typing import List
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_INTERVAL = 5.0   # Au plus ces quelques secondes de jeu perdues en cas d'arrêt (s)
+SNAPSHOT_TIMEOUT = 2.0    # Attente maximale des rooms pour capturer leur état (s)
+RESTORE_GRACE = 120.0     # Délai laissé aux joueurs d'une room restaurée pour revenir (s)
+
+# Format du fichier : un objet JSON compact
+#   {"version": 1, "saved": horodatage, "rooms": [GameRoom.snapshot(), ...]}
+# réécrit en entier à chaque sauvegarde, via un fichier temporaire renommé
+# (un arrêt pendant l'écriture laisse le snapshot précédent intact).
+
+
+class SnapshotError(Exception):
+    """Snapshot illisible ou incompatible"""
+
+
+def write_snapshot(path: str, rooms: List[dict]) -> None:
+    """Écrit l'état des rooms de façon atomique"""
+    payload = json.dumps({"version": SNAPSHOT_VERSION, "saved": time.time(), "rooms": rooms},
+                         separators=(",", ":"))
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def read_snapshot(path: str) -> List[dict]:
+    """Relit les rooms d'un snapshot (liste vide s'il n'existe pas)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    except ValueError as e:
+        raise SnapshotError(f"Snapshot illisible: {str(e)}")
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Version de snapshot non supportée: {data.get('version')}")
+    return data["rooms"]
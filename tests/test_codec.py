@@ -0,0 +1,73 @@
+import pytest
+from codec import COMPACT_CODEC, CODECS, JSON_CODEC, CodecError, decode_payload, negotiate_codec
+from protocol import FrameDecoder, ProtocolError, decode_message, encode_frame, encode_message
+
+STATE = {
+    "type": "game_state",
+    "seq": 3,
+    "size": 5,
+    "environment": list("######P L##   ##   ######"),
+    "is_your_turn": True,
+    "player_status": "alive",
+    "current_player": "p0"
+}
+DELTA = {
+    "type": "game_state_delta",
+    "seq": 4,
+    "changes": [[6, " "], [7, "P"]],
+    "is_your_turn": False,
+    "current_player": "p1"
+}
+CHAT = {"type": "chat", "player": "p0", "content": "été"}
+
+
+@pytest.mark.parametrize("codec", list(CODECS.values()), ids=list(CODECS))
+@pytest.mark.parametrize("message", [STATE, DELTA, CHAT, {"type": "inconnu", "x": 1}])
+def test_round_trip(codec, message):
+    assert decode_message(codec.encode(message)) == message
+
+
+def test_compact_game_state_accepts_raw_view():
+    message = dict(STATE, environment="".join(STATE["environment"]).encode())
+    assert decode_payload(COMPACT_CODEC.encode(message)) == STATE
+
+
+@pytest.mark.parametrize("status", ["dead", "spectator"])
+def test_compact_keeps_player_status(status):
+    message = dict(STATE, is_your_turn=False, player_status=status)
+    assert decode_payload(COMPACT_CODEC.encode(message)) == message
+
+
+@pytest.mark.parametrize("payload", [
+    b"",
+    b"\x07[1]",          # Tag compact suivi d'une liste JSON
+    b"\x00\"texte\"",    # Message générique qui n'est pas un objet
+    b"\x00[1, 2]",
+    b"\x63{}",           # Tag inconnu
+    b"\x01\x00",         # game_state tronqué
+    b"{pas du json",
+])
+def test_malformed_payload_is_a_protocol_error(payload):
+    with pytest.raises(ProtocolError):
+        decode_message(payload)
+
+
+def test_decoder_rejects_malformed_frame():
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed_messages(encode_frame(b"\x07[1]"))
+
+
+def test_json_codec_rejects_non_object():
+    with pytest.raises(CodecError):
+        JSON_CODEC.decode(b"[1]")
+
+
+def test_negotiate_codec_falls_back_to_json():
+    assert negotiate_codec(["inconnu", 3]) is JSON_CODEC
+    assert negotiate_codec("compact") is JSON_CODEC
+    assert negotiate_codec(["compact", "json"]) is COMPACT_CODEC
+
+
+def test_encode_message_is_framed():
+    frame = encode_message(CHAT, COMPACT_CODEC)
+    assert FrameDecoder().feed_messages(frame) == [CHAT]
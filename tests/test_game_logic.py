@@ -0,0 +1,146 @@
+import json
+import random
+import pytest
+from game_logic import EMPTY, GameLogic, grid_template
+
+
+def check_free_cells(logic: GameLogic) -> None:
+    """La liste des cases libres et leur position dans la liste reflètent exactement la grille"""
+    free = [i for i, cell in enumerate(logic.grid) if cell == EMPTY]
+    assert sorted(logic.free_cells) == free
+    for slot, index in enumerate(logic.free_cells):
+        assert logic.free_slots[index] == slot
+    occupied = set(range(len(logic.grid))) - set(free)
+    assert all(logic.free_slots[index] == -1 for index in occupied)
+
+
+def populated(size: int = 9, nb_players: int = 12, seed: int = 0) -> GameLogic:
+    logic = GameLogic(size, random.Random(seed))
+    for i in range(nb_players):
+        logic.add_player(f"p{i}", "loup" if i < 3 else "villageois")
+    return logic
+
+
+def test_new_grid_has_walls_and_free_interior():
+    logic = GameLogic(7)
+    assert len(logic.free_cells) == 25
+    check_free_cells(logic)
+
+
+def test_free_cells_follow_moves_and_deaths():
+    logic = populated()
+    rng = random.Random(1)
+    for _ in range(2000):
+        logic.move_player(f"p{rng.randrange(12)}", rng.randint(1, 8))
+    check_free_cells(logic)
+    alive = [name for name, player in logic.players.items() if player["status"] == "alive"]
+    assert len(logic.free_cells) == 49 - len(alive)
+    assert len(logic.positions) == len(alive)
+
+
+def test_random_empty_position_is_free():
+    logic = populated()
+    for _ in range(100):
+        x, y = logic.get_random_empty_position()
+        assert logic.get_cell(x, y) == EMPTY
+
+
+def test_full_grid_raises():
+    logic = GameLogic(5)
+    for i in range(9):
+        logic.add_player(f"p{i}", "villageois")
+    with pytest.raises(IndexError):
+        logic.get_random_empty_position()
+
+
+def test_reset_restores_template_without_touching_it():
+    logic = populated()
+    logic.reset(random.Random(2))
+    assert not logic.players and not logic.positions
+    check_free_cells(logic)
+    grid, _, free_cells, _ = grid_template(9)
+    assert bytes(logic.grid) == grid
+    assert list(free_cells) == list(logic.free_cells)
+    logic.add_player("x", "loup")
+    assert len(grid_template(9)[2]) == 49  # Le modèle partagé n'est pas modifié
+
+
+def place(logic: GameLogic, name: str, role: str, x: int, y: int) -> None:
+    """Ajoute un joueur puis le déplace sur une case choisie"""
+    logic.add_player(name, role)
+    player = logic.players[name]
+    old_x, old_y = player['position']
+    del logic.positions[(old_x, old_y)]
+    logic.move_cell(old_y * logic.size + old_x, y * logic.size + x)
+    logic.positions[(x, y)] = name
+    player['position'] = (x, y)
+
+
+def test_tick_wolf_catches_fleeing_villager():
+    logic = GameLogic(9)
+    place(logic, "loup", "loup", 2, 2)
+    place(logic, "villageois", "villageois", 3, 2)
+    assert logic.resolve_tick({"loup": 4, "villageois": 4}) == ["villageois"]
+    assert logic.players["loup"]["position"] == (3, 2)
+    assert logic.players["villageois"]["status"] == "dead"
+    check_free_cells(logic)
+
+
+def test_tick_wolf_and_villager_on_free_cell():
+    logic = GameLogic(9)
+    place(logic, "loup", "loup", 4, 5)
+    place(logic, "villageois", "villageois", 6, 5)
+    assert logic.resolve_tick({"loup": 4, "villageois": 3}) == ["villageois"]
+    assert logic.positions == {(5, 5): "loup"}
+    check_free_cells(logic)
+
+
+def test_tick_conflicts_between_same_roles():
+    logic = GameLogic(9)
+    place(logic, "b", "loup", 4, 5)
+    place(logic, "a", "loup", 2, 5)
+    place(logic, "v1", "villageois", 2, 2)
+    place(logic, "v2", "villageois", 4, 2)
+    assert logic.resolve_tick({"a": 4, "b": 3, "v1": 4, "v2": 3}) == []
+    # Seul le premier loup dans l'ordre alphabétique avance, les villageois restent sur place
+    assert logic.players["a"]["position"] == (3, 5)
+    assert logic.players["b"]["position"] == (4, 5)
+    assert logic.players["v1"]["position"] == (2, 2)
+    assert logic.players["v2"]["position"] == (4, 2)
+    check_free_cells(logic)
+
+
+def test_tick_uses_positions_from_start_of_tick():
+    logic = GameLogic(9)
+    place(logic, "v1", "villageois", 2, 2)
+    place(logic, "v2", "villageois", 3, 2)
+    place(logic, "mort", "villageois", 6, 6)
+    logic.kill_player("mort")
+    # v2 libère sa case pendant le tick mais elle était occupée au début : v1 ne bouge pas
+    assert logic.resolve_tick({"v1": 4, "v2": 4, "mort": 1, "fantome": 2}) == []
+    assert logic.players["v1"]["position"] == (2, 2)
+    assert logic.players["v2"]["position"] == (4, 2)
+    assert logic.players["mort"]["position"] == (6, 6)
+    check_free_cells(logic)
+
+
+def test_snapshot_round_trip():
+    logic = populated(seed=3)
+    logic.kill_player("p5")
+    data = json.loads(json.dumps(logic.snapshot()))
+    restored = GameLogic.restore(data, random.Random(4))
+    assert restored.grid == logic.grid
+    assert restored.free_cells == logic.free_cells
+    assert restored.players == logic.players
+    assert restored.positions == logic.positions
+    check_free_cells(restored)
+    # Même ordre de cases libres : mêmes tirages à générateur égal
+    logic.rng = random.Random(4)
+    assert restored.get_random_empty_position() == logic.get_random_empty_position()
+
+
+def test_restore_rejects_mismatched_grid():
+    data = populated().snapshot()
+    data["size"] = 7
+    with pytest.raises(ValueError):
+        GameLogic.restore(data)
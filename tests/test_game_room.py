@@ -0,0 +1,193 @@
+import json
+from protocol import FrameDecoder
+from scheduler import TimerWheel
+from server import GameRoom, GameServer
+
+
+class FakeSocket:
+    """Connexion factice : garde les trames au lieu de les envoyer"""
+
+    def __init__(self):
+        self.frames = []
+
+    def send_frame(self, data: bytes, kind: str = None) -> None:
+        self.frames.append(data)
+
+    def sendall(self, data: bytes) -> None:
+        self.frames.append(data)
+
+    def close(self) -> None:
+        pass
+
+
+def received(client: FakeSocket) -> list:
+    return FrameDecoder().feed_messages(b"".join(client.frames))
+
+
+def chat_contents(client: FakeSocket) -> list:
+    """Contenus de chat reçus, qu'ils arrivent seuls ou groupés"""
+    contents = []
+    for message in received(client):
+        if message["type"] == "chat":
+            contents.append(message["content"])
+        elif message["type"] == "chat_batch":
+            contents.extend(entry["content"] for entry in message["messages"])
+    return contents
+
+
+def make_room(size: int = 7, nb_players: int = 4, **options) -> GameRoom:
+    # Sans acteur ni timers : les commandes sont appelées directement
+    room = GameRoom("test", actor_factory=lambda name: None, size=size, **options)
+    for i in range(nb_players):
+        room.add_player(FakeSocket(), f"p{i}")
+    return room
+
+
+def test_start_game_rejects_more_players_than_free_cells():
+    room = make_room(size=5, nb_players=10)  # 9 cases libres
+    initiator = next(iter(room.players))
+    assert not room.start_game(initiator)
+    assert not room.started
+    assert not room.game_logic.players
+
+
+def test_start_game_places_every_player():
+    room = make_room(size=5, nb_players=9)
+    assert room.start_game(next(iter(room.players)))
+    assert set(room.game_logic.players) == {f"p{i}" for i in range(9)}
+    assert not room.game_logic.free_cells
+
+
+def test_resync_requests_are_rate_limited():
+    room = make_room()
+    room.start_game(next(iter(room.players)))
+    client = next(iter(room.players))
+    sent = len(client.frames)
+    room.request_resync(client)
+    room.request_resync(client)  # Ignorée : trop proche de la précédente
+    assert len(client.frames) == sent + 1
+
+
+def test_chat_history_is_not_sent_twice():
+    wheel = TimerWheel()
+    wheel.stop()  # Le regroupement du chat reste en attente
+    room = make_room(timers=wheel)
+    author = next(iter(room.players))
+    room.post_chat(author, "bonjour")
+    room.post_chat(author, "salut")
+    assert room.pending_chat
+    newcomer, spectator = FakeSocket(), FakeSocket()
+    room.add_player(newcomer, "nouveau")
+    room.add_spectator(spectator)
+    room.flush_chat()
+    for client in (newcomer, spectator, author):
+        contents = chat_contents(client)
+        assert contents.count("bonjour") == 1 and contents.count("salut") == 1
+
+
+def test_snapshot_restores_seats_and_turn_order():
+    room = make_room()
+    room.start_game(next(iter(room.players)))
+    room.post_chat(next(iter(room.players)), "avant")
+    data = json.loads(json.dumps(room.snapshot()))
+
+    restored = GameRoom("test", actor_factory=lambda name: None, size=7)
+    restored.restore_snapshot(data)
+    assert restored.started
+    assert restored.rng.getstate() == room.rng.getstate()
+    assert [player["name"] for player in restored.players.values()] == [f"p{i}" for i in range(4)]
+    assert [restored.players[key]["token"] for key in restored.turns] == \
+        [room.players[key]["token"] for key in room.turns]
+    assert list(restored.messages) == list(room.messages)
+
+    # Le joueur revient avec son jeton : même rôle, état complet
+    player = next(iter(room.players.values()))
+    client = FakeSocket()
+    assert restored.rebind_player(player["token"], client)
+    types = [message["type"] for message in received(client)]
+    assert {"role_assignment", "game_state"} <= set(types)
+    assert restored.players[client]["role"] == player["role"]
+
+
+class QueuedActor:
+    """Acteur factice : les commandes attendent qu'on les exécute avec run_pending()"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.commands = []
+        self.stopped = False
+
+    def submit(self, func, *args) -> None:
+        self.commands.append((func, args))
+
+    def is_idle(self) -> bool:
+        return not self.commands
+
+    def stop(self) -> None:
+        self.stopped = True
+
+    def run_pending(self) -> None:
+        while self.commands:
+            func, args = self.commands.pop(0)
+            func(*args)
+
+
+def test_empty_room_is_released_after_pending_commands():
+    server = GameServer(heartbeat_interval=0)
+    room = GameRoom("vide", actor_factory=QueuedActor, size=7)
+    server.rooms["vide"] = room
+    client = FakeSocket()
+    room.add_player(client, "seul")
+    room.submit(room.snapshot)  # Capture en attente dans la file de la room
+    server.leave_room(room, client)
+    assert server.rooms.get("vide") is room
+    room.actor.run_pending()
+    assert "vide" not in server.rooms
+    assert len(server.pool) == 1
+
+
+def test_unknown_token_in_started_room_joins_as_spectator():
+    server = GameServer(heartbeat_interval=0)
+    room = make_room()
+    room.start_game(next(iter(room.players)))
+    client = FakeSocket()
+    server.rejoin_room(room, client, "jeton-expiré", "retardataire")
+    assert client not in room.players and client in room.spectators
+    room.broadcast_game_state()  # Plus de KeyError : le retardataire n'a pas de place dans la grille
+    assert "error" in [message["type"] for message in received(client)]
+
+
+def test_turn_keeps_advancing_after_an_idle_round():
+    wheel = TimerWheel()
+    wheel.stop()  # Les échéances sont déclenchées à la main
+    room = make_room(timers=wheel, turn_timeout=0.1)
+    room.actor = QueuedActor("test")
+    room.start_game(next(iter(room.players)))
+    first = room.current_turn
+    for _ in range(2 * len(room.turns)):
+        assert room.turn_timer is not None
+        turn_number = room.turn_number
+        room.expire_turn(turn_number)
+        assert room.turn_number == turn_number + 1
+    assert room.current_turn is first and room.turn_timer is not None
+    # Le coup d'un autre joueur est ignoré, mais l'échéance suivante fait encore tourner la main
+    other = next(client for client in room.players if client is not first)
+    room.handle_move(other, 1)
+    assert room.current_turn is first
+    room.expire_turn(room.turn_number)
+    assert room.current_turn is not first and room.turn_timer is not None
+
+
+def test_replaced_connection_does_not_free_a_lobby_seat():
+    server = GameServer(heartbeat_interval=0)
+    released = []
+    server.matchmaker.release = released.append
+    room = make_room()
+    old = next(iter(room.players))
+    token = room.players[old]["token"]
+    new = FakeSocket()
+    assert room.rebind_player(token, new)
+    # La fermeture de l'ancienne socket fait passer son gestionnaire par leave_room
+    server.leave_room(room, old)
+    assert new in room.players and len(room.players) == 4
+    assert released == []
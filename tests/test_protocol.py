@@ -0,0 +1,62 @@
+import pytest
+from protocol import HEADER_SIZE, FrameDecoder, ProtocolError, apply_changes, diff_views, encode_frame, encode_message
+
+
+def test_encode_frame_prefixes_length():
+    frame = encode_frame(b"abc")
+    assert frame == b"\x00\x00\x00\x03abc"
+
+
+def test_decoder_returns_complete_frames_in_order():
+    decoder = FrameDecoder()
+    data = encode_frame(b"un") + encode_frame(b"") + encode_frame(b"trois")
+    assert decoder.feed(data) == [b"un", b"", b"trois"]
+    assert decoder.buffer == bytearray()
+
+
+def test_decoder_waits_for_partial_frames():
+    decoder = FrameDecoder()
+    data = encode_frame(b"bonjour") + encode_frame(b"x")
+    frames = []
+    for i in range(len(data)):
+        frames.extend(decoder.feed(data[i:i + 1]))  # Un octet à la fois
+    assert frames == [b"bonjour", b"x"]
+
+
+def test_decoder_keeps_partial_header():
+    decoder = FrameDecoder()
+    data = encode_frame(b"abc")
+    assert decoder.feed(data[:HEADER_SIZE - 1]) == []
+    assert decoder.feed(data[HEADER_SIZE - 1:]) == [b"abc"]
+
+
+def test_decoder_rejects_oversized_frame():
+    decoder = FrameDecoder(max_frame_size=4)
+    with pytest.raises(ProtocolError):
+        decoder.feed(encode_frame(b"12345"))
+
+
+def test_feed_messages_decodes_json():
+    decoder = FrameDecoder()
+    message = {"type": "chat", "player": "p0", "content": "salut"}
+    assert decoder.feed_messages(encode_message(message)) == [message]
+
+
+def test_feed_messages_rejects_invalid_json():
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed_messages(encode_frame(b"{pas du json"))
+
+
+def test_diff_views_lists_changed_cells():
+    old = b"#   #" b"# P #" b"#   #"
+    new = b"#   #" b"#  P#" b"# L #"
+    assert diff_views(old, new, 5) == [[7, " "], [8, "P"], [12, "L"]]
+    assert diff_views(new, new, 5) == []
+
+
+def test_apply_changes_rebuilds_new_view():
+    old = b"#   ##P  #"
+    new = b"# L ##  P#"
+    board = list(old.decode())
+    apply_changes(board, diff_views(old, new, 5))
+    assert "".join(board) == new.decode()
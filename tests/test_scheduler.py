@@ -0,0 +1,65 @@
+from scheduler import TimerWheel, TurnRing
+
+
+def test_ring_keeps_insertion_order():
+    ring = TurnRing("abc")
+    assert list(ring) == ["a", "b", "c"]
+    assert ring.advance() == "b"
+    ring.add("d")  # En fin de tour, juste avant le joueur courant
+    assert list(ring) == ["b", "c", "a", "d"]
+
+
+def test_ring_remove_current_passes_turn():
+    ring = TurnRing("abc")
+    assert ring.remove("a")
+    assert ring.current == "b"
+    assert not ring.remove("c")
+    assert list(ring) == ["b"]
+    assert ring.advance() == "b"
+    assert ring.remove("b")
+    assert ring.current is None and len(ring) == 0
+    assert ring.advance() is None
+
+
+def test_ring_replace_keeps_place():
+    ring = TurnRing("abc")
+    ring.replace("a", "x")
+    ring.replace("c", "z")
+    assert list(ring) == ["x", "b", "z"]
+    assert "a" not in ring and "x" in ring
+    single = TurnRing("a")
+    single.replace("a", "b")
+    assert list(single) == ["b"] and single.advance() == "b"
+
+
+def stopped_wheel(slots: int = 8) -> TimerWheel:
+    # Roue arrêtée : son thread se termine aussitôt et on l'avance à la main
+    wheel = TimerWheel(tick=1.0, slots=slots)
+    wheel.stop()
+    return wheel
+
+
+def test_wheel_fires_at_expiry():
+    wheel = stopped_wheel()
+    fired = []
+    wheel.schedule(3, fired.append, "a")
+    wheel.schedule(0, fired.append, "b")  # Au moins une case
+    assert [t.args for t in wheel.advance()] == [("b",)]
+    assert wheel.advance() == []
+    assert [t.args for t in wheel.advance()] == [("a",)]
+
+
+def test_wheel_long_delay_waits_several_turns():
+    wheel = stopped_wheel(slots=4)
+    timer = wheel.schedule(10, print)
+    due = [tick for tick in range(1, 13) if timer in wheel.advance()]
+    assert due == [10]
+
+
+def test_wheel_cancel():
+    wheel = stopped_wheel()
+    timer = wheel.schedule(2, print)
+    wheel.cancel(timer)
+    wheel.cancel(timer)
+    wheel.cancel(None)
+    assert wheel.advance() == [] and wheel.advance() == []